@@ -0,0 +1,275 @@
+from minisom import MiniSom
+
+import numpy as np
+
+BMU_BLOCK = 2 ** 22  # Максимальный размер блока матрицы расстояний (элементов)
+
+
+def compute_dtype(data):
+    """
+    Функция выбора типа вычислений для данных
+
+    Данные float32 (компактный режим SOM) обрабатываются в float32, остальные - в float64.
+
+    :param data: данные
+    :type data: numpy.ndarray
+
+    :rtype: type
+    :return: numpy.float32 или numpy.float64
+    """
+    return np.float32 if getattr(data, 'dtype', None) == np.float32 else np.float64
+
+
+def distance_blocks(codebook, codebook_sq, data, step, dtype):
+    """
+    Функция вычисления расстояний от образцов до всех нейронов по блокам данных
+
+    Расстояния вычисляются матричным произведением: ||x - w||^2 = ||x||^2 - 2 * x * w + ||w||^2,
+    слагаемое ||x||^2 на выбор нейронов не влияет и опускается.
+
+    :param codebook: веса нейронов формы (нейроны, признаки) типа dtype
+    :type codebook: numpy.ndarray
+    :param codebook_sq: квадраты норм весов нейронов
+    :type codebook_sq: numpy.ndarray
+    :param data: образцы формы (образцы, признаки)
+    :type data: numpy.ndarray
+    :param step: количество строк в блоке
+    :type step: int
+    :param dtype: тип вычислений
+    :type dtype: type
+
+    :return: генератор пар (начало блока, расстояния формы (строки блока, нейроны))
+    """
+    for start in range(0, len(data), step):
+        distances = np.dot(np.asarray(data[start:start + step], dtype=dtype), codebook.T)
+        distances *= -2
+        distances += codebook_sq
+        yield start, distances
+
+
+def find_bmu(weights, data, codebook_sq=None, dtype=None):
+    """
+    Функция векторизованного поиска нейронов-победителей
+
+    Расстояния вычисляются функцией distance_blocks. Для данных float32 расстояния
+    вычисляются в float32 (compute_dtype). Данные обрабатываются блоками, чтобы
+    матрица расстояний не превышала BMU_BLOCK элементов.
+
+    :param weights: веса карты формы (строки, столбцы, признаки) или (нейроны, признаки)
+    :type weights: numpy.ndarray
+    :param data: образцы формы (образцы, признаки)
+    :type data: numpy.ndarray
+    :param codebook_sq: заранее вычисленные квадраты норм весов (None - вычисляются)
+    :type codebook_sq: numpy.ndarray
+    :param dtype: тип вычислений (None - compute_dtype(data))
+    :type dtype: type
+
+    :rtype: numpy.ndarray
+    :return: плоские индексы нейронов-победителей
+    """
+    if dtype is None:
+        dtype = compute_dtype(data)
+    codebook = weights.reshape(-1, weights.shape[-1]).astype(dtype, copy=False)
+    if codebook_sq is None:
+        codebook_sq = np.einsum('ij,ij->i', codebook, codebook)
+    step = block_rows(codebook)
+    bmu = np.empty(len(data), dtype=np.intp)
+    for start, distances in distance_blocks(codebook, codebook_sq, data, step, dtype):
+        bmu[start:start + step] = np.argmin(distances, axis=1)
+    return bmu
+
+
+def block_rows(weights):
+    """
+    Функция выбора количества строк блока данных для поиска победителей
+
+    :param weights: веса карты
+    :type weights: numpy.ndarray
+
+    :rtype: int
+    :return: количество строк, при котором матрица расстояний не превышает BMU_BLOCK элементов
+    """
+    return max(1, BMU_BLOCK // (weights.size // weights.shape[-1]))
+
+
+def quantization_error(weights, data, chunk_size=None):
+    """
+    Функция вычисления ошибки квантования по блокам данных
+
+    :param weights: веса карты
+    :type weights: numpy.ndarray
+    :param data: нормализованные данные
+    :type data: numpy.ndarray
+    :param chunk_size: количество строк в блоке
+    :type chunk_size: int
+
+    :rtype: float
+    :return: среднее расстояние от образцов до нейронов-победителей
+    """
+    dtype = compute_dtype(data)
+    codebook = weights.reshape(-1, weights.shape[-1]).astype(dtype, copy=False)
+    codebook_sq = np.einsum('ij,ij->i', codebook, codebook)
+    step = chunk_size or block_rows(weights)
+    total = 0.
+    for start in range(0, len(data), step):
+        block = np.asarray(data[start:start + step], dtype=dtype)
+        bmu = find_bmu(codebook, block, codebook_sq, dtype)
+        total += float(np.linalg.norm(block - codebook[bmu], axis=1).sum())
+    return total / len(data)
+
+
+def topographic_error(som, data, chunk_size=None):
+    """
+    Функция вычисления топографической ошибки по блокам данных
+
+    Как и в MiniSom.topographic_error для гексагональной сетки, ошибкой считается образец,
+    у которого первый и второй по близости нейроны не являются соседями (расстояние
+    между ними на плоскости карты отлично от 1).
+
+    :param som: обученная карта
+    :type som: minisom.MiniSom
+    :param data: нормализованные данные
+    :type data: numpy.ndarray
+    :param chunk_size: количество строк в блоке
+    :type chunk_size: int
+
+    :rtype: float
+    :return: доля образцов с топографической ошибкой
+    """
+    weights = som.get_weights()
+    dtype = compute_dtype(data)
+    codebook = weights.reshape(-1, weights.shape[-1]).astype(dtype, copy=False)
+    codebook_sq = np.einsum('ij,ij->i', codebook, codebook)
+    xx, yy = som.get_euclidean_coordinates()
+    coordinates = np.column_stack((xx.ravel(), yy.ravel()))
+    step = chunk_size or block_rows(weights)
+    errors = 0
+    for start, distances in distance_blocks(codebook, codebook_sq, data, step, dtype):
+        best = np.argpartition(distances, 1, axis=1)[:, :2]
+        gap = np.linalg.norm(coordinates[best[:, 0]] - coordinates[best[:, 1]], axis=1)
+        errors += np.count_nonzero(~np.isclose(gap, 1))
+    return errors / len(data)
+
+
+class BatchSom(MiniSom):
+    """
+    Самоорганизующаяся карта с пакетным алгоритмом обучения
+
+    Вместо обновления весов после каждого образца (MiniSom.train) на каждой
+    эпохе находятся победители для всего датасета сразу, а веса пересчитываются
+    как взвешенное гауссовым соседством среднее образцов, поэтому коэффициент
+    обучения (learning_rate) не используется. Остальные методы
+    (distance_map, winner, quantization_error и т.д.) наследуются от MiniSom.
+    """
+    min_epochs = 10  # Минимальное количество пакетных эпох
+
+    def batch_epochs(self, data_len, num_iteration):
+        """
+        Функция пересчета количества итераций MiniSom в пакетные эпохи
+
+        Число предъявлений образцов сохраняется таким же, как у MiniSom.train,
+        чтобы длительность обучения двух алгоритмов была сопоставима.
+
+        :param data_len: количество образцов
+        :type data_len: int
+        :param num_iteration: количество итераций (предъявлений образцов)
+        :type num_iteration: int
+
+        :rtype: int
+        :return: количество пакетных эпох
+        """
+        return max(self.min_epochs, int(np.ceil(num_iteration / data_len)))
+
+    def neighborhood_dot(self, values, sigma):
+        """
+        Функция умножения значений нейронов на матрицу гауссова соседства
+
+        Используются те же координаты сетки, что и в MiniSom._gaussian. Координата
+        нейрона (i, j) равна (r_i + off_j, y_j), поэтому гауссиана раскладывается
+        в произведение множителей по строкам и столбцам, и матрица соседства
+        размера (нейроны, нейроны) не строится.
+
+        :param values: значения нейронов формы (строки, столбцы, k)
+        :type values: numpy.ndarray
+        :param sigma: радиус соседства
+        :type sigma: float
+
+        :rtype: numpy.ndarray
+        :return: сглаженные значения формы (строки, столбцы, k)
+        """
+        xx, yy = self.get_euclidean_coordinates()
+        rows = xx[:, 0] - xx[0, 0]
+        offsets = xx[0]
+        d = 2 * sigma * sigma
+        gy = np.exp(-(yy[0][:, np.newaxis] - yy[0]) ** 2 / d)
+        result = np.zeros_like(values)
+        for a in np.unique(offsets):
+            target = offsets == a
+            for b in np.unique(offsets):
+                source = offsets == b
+                gx = np.exp(-((rows + a)[:, np.newaxis] - (rows + b)) ** 2 / d)
+                tmp = np.tensordot(gx, values[:, source], axes=1)
+                result[:, target] += np.einsum('ikd,kj->ijd', tmp, gy[np.ix_(source, target)])
+        return result
+
+    def quantization_error(self, data):
+        """
+        Функция вычисления ошибки квантования по блокам данных
+
+        :param data: нормализованные данные
+        :type data: numpy.ndarray
+
+        :rtype: float
+        :return: среднее расстояние от образцов до нейронов-победителей
+        """
+        self._check_input_len(data)
+        return quantization_error(self._weights, data)
+
+    def train(self, data, num_iteration, verbose=False, callback=None, chunk_size=None):
+        """
+        Функция пакетного обучения карты
+
+        Данные (в том числе numpy.memmap) обрабатываются блоками по chunk_size строк,
+        поэтому объем памяти определяется размером блока, а не датасета.
+
+        :param data: нормализованные данные
+        :type data: numpy.ndarray
+        :param num_iteration: количество итераций (как в MiniSom.train)
+        :type num_iteration: int
+        :param verbose: вывод ошибки квантования по окончании обучения
+        :type verbose: bool
+        :param callback: функция callback(эпоха, количество эпох), вызываемая после каждой эпохи;
+            если она возвращает False, обучение прерывается
+        :type callback: callable
+        :param chunk_size: количество строк в блоке (None - по размеру BMU_BLOCK)
+        :type chunk_size: int
+
+        :rtype: bool
+        :return: True, если обучение не было прервано
+        """
+        self._check_iteration_number(num_iteration)
+        self._check_input_len(data)
+        epochs = self.batch_epochs(len(data), num_iteration)
+        shape = self._weights.shape
+        nodes = shape[0] * shape[1]
+        step = chunk_size or block_rows(self._weights)
+        for t in range(epochs):
+            # Асимптотическое уменьшение радиуса, как в MiniSom
+            sigma = self._sigma / (1 + t / (epochs / 2))
+            # Суммы образцов и количество попаданий по каждому нейрону
+            hits = np.zeros(nodes)
+            sums = np.zeros((nodes, shape[2]))
+            for start in range(0, len(data), step):
+                block = np.asarray(data[start:start + step], dtype=compute_dtype(data))
+                bmu = find_bmu(self._weights, block)
+                hits += np.bincount(bmu, minlength=nodes)
+                for k in range(shape[2]):
+                    sums[:, k] += np.bincount(bmu, weights=block[:, k], minlength=nodes)
+            numerator = self.neighborhood_dot(sums.reshape(shape), sigma)
+            denominator = self.neighborhood_dot(hits.reshape(shape[0], shape[1], 1), sigma)
+            self._weights = numerator / np.where(denominator > 0, denominator, 1)
+            if callback is not None and callback(t + 1, epochs) is False:
+                return False
+        if verbose:
+            print('\n quantization error:', self.quantization_error(data))
+        return True
@@ -0,0 +1,88 @@
+import numpy as np
+
+from BatchSom import find_bmu
+
+KDTREE_MIN_NODES = 1024  # Количество нейронов, начиная с которого метод 'auto' выбирает KD-дерево
+CHECK_SAMPLES = 10000  # Количество образцов для проверки точности индекса
+
+
+class CodebookIndex():
+    """
+    Индекс весов обученной карты для поиска нейронов-победителей
+
+    Методы поиска:
+        'brute' - полный перебор матричным произведением с заранее вычисленными
+        квадратами норм весов (как find_bmu), веса могут храниться в float32;
+        'kdtree' - KD-дерево sklearn.neighbors.KDTree, выгодное для больших карт.
+    Индекс строится один раз после обучения и используется для всех запросов.
+    """
+
+    def __init__(self, weights, method='auto', dtype=np.float64, leaf_size=40):
+        """
+        Конструктор класса CodebookIndex
+        :param weights: веса карты формы (строки, столбцы, признаки) или (нейроны, признаки)
+        :type weights: numpy.ndarray
+        :param method: метод поиска ('auto', 'brute' или 'kdtree')
+        :type method: str
+        :param dtype: тип хранения весов для полного перебора (numpy.float64 или numpy.float32)
+        :type dtype: type
+        :param leaf_size: размер листа KD-дерева
+        :type leaf_size: int
+        """
+        self.codebook = np.ascontiguousarray(weights.reshape(-1, weights.shape[-1]), dtype=np.float64)
+        if method == 'auto':
+            method = 'kdtree' if len(self.codebook) >= KDTREE_MIN_NODES else 'brute'
+        if method not in ('brute', 'kdtree'):
+            raise ValueError(f"Unknown index method '{method}', expected 'auto', 'brute' or 'kdtree'")
+        self.method = method
+        self.dtype = np.dtype(dtype)
+        if method == 'kdtree':
+            from sklearn.neighbors import KDTree
+            self.tree = KDTree(self.codebook, leaf_size=leaf_size)
+        else:
+            self.weights = self.codebook.astype(self.dtype)
+            self.weights_sq = np.einsum('ij,ij->i', self.weights, self.weights)
+
+    def query(self, data):
+        """
+        Функция поиска нейронов-победителей
+
+        :param data: нормализованные образцы формы (образцы, признаки) или (признаки,)
+        :type data: numpy.ndarray
+
+        :rtype: numpy.ndarray
+        :return: плоские индексы нейронов-победителей
+        """
+        data = np.asarray(data).reshape(-1, self.codebook.shape[1])
+        if self.method == 'kdtree':
+            return self.tree.query(data, return_distance=False)[:, 0]
+        return find_bmu(self.weights, data, self.weights_sq, self.dtype)
+
+    def check(self, data, samples=CHECK_SAMPLES, seed=0):
+        """
+        Функция проверки точности индекса сравнением с полным перебором в float64
+
+        Несовпадение победителей допустимо, если образец равноудален от обоих нейронов
+        (например, из-за округления в float32), поэтому дополнительно возвращается
+        наибольшее превышение расстояния до найденного нейрона над минимальным.
+
+        :param data: нормализованные образцы
+        :type data: numpy.ndarray
+        :param samples: количество случайно выбранных образцов (None - все)
+        :type samples: int
+        :param seed: начальное значение генератора случайных чисел
+        :type seed: int
+
+        :rtype: dict
+        :return: доля совпадений и наибольшее превышение расстояния
+        """
+        if samples is not None and len(data) > samples:
+            rows = np.sort(np.random.default_rng(seed).choice(len(data), samples, replace=False))
+            data = data[rows]
+        data = np.asarray(data, dtype=np.float64)
+        exact = find_bmu(self.codebook, data)
+        found = self.query(data)
+        excess = np.linalg.norm(data - self.codebook[found], axis=1) - \
+            np.linalg.norm(data - self.codebook[exact], axis=1)
+        return dict(method=self.method, dtype=self.dtype.name, samples=len(data),
+                    agreement=float(np.mean(found == exact)), max_distance_excess=float(np.max(excess, initial=0.)))
@@ -0,0 +1,280 @@
+import hashlib
+import os
+
+import numpy as np
+import pandas as pd
+
+import SomStorage
+
+CACHE_VERSION = 1  # Версия формата кэша датасета
+CACHE_SUFFIX = '.cache.npz'  # Суффикс файла кэша, создаваемого рядом с файлом данных
+LABEL_COLUMN = 'Type'  # Столбец с метками классов
+
+
+def file_hash(fname):
+    """
+    Функция вычисления хэша содержимого файла
+
+    :param fname: имя файла
+    :type fname: str
+
+    :rtype: str
+    :return: хэш SHA-1
+    """
+    sha = hashlib.sha1()
+    with open(fname, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            sha.update(block)
+    return sha.hexdigest()
+
+
+def read_table(fname):
+    """
+    Функция чтения таблицы с данными из файла Excel или CSV
+
+    В файлах Excel первая строка содержит подробные названия столбцов, а вторая -
+    краткие обозначения. Если краткие обозначения найдены в первой строке данных,
+    они становятся заголовками столбцов.
+
+    :param fname: имя файла
+    :type fname: str
+
+    :rtype: pandas.DataFrame
+    :return: таблица с данными
+    """
+    if os.path.splitext(fname)[1].lower() == '.csv':
+        data = pd.read_csv(fname)
+    else:
+        data = pd.read_excel(fname)
+    if LABEL_COLUMN not in data.columns:
+        data = data.rename(columns=data.iloc[0]).drop(data.index[0])
+    return data
+
+
+def cache_name(fname, dtype=np.float64):
+    """
+    Функция определения имени файла кэша датасета
+
+    Кэш матрицы float64 хранится в <fname>.cache.npz, матрицы другого типа -
+    в <fname>.<тип>.cache.npz, поэтому кэши разных типов не перезаписывают друг друга.
+
+    :param fname: имя файла данных
+    :type fname: str
+    :param dtype: тип числовой матрицы
+    :type dtype: type
+
+    :rtype: str
+    :return: имя файла кэша
+    """
+    dtype = np.dtype(dtype)
+    if dtype == np.float64:
+        return fname + CACHE_SUFFIX
+    return f"{fname}.{dtype.name}{CACHE_SUFFIX}"
+
+
+def iter_chunks(fname, chunk_size, dtype=np.float64):
+    """
+    Функция потокового чтения файла данных блоками
+
+    CSV читается через pandas.read_csv(chunksize=...), Excel - построчно в режиме
+    openpyxl read_only, поэтому в памяти одновременно находится не больше одного блока.
+    Файл может не содержать столбца меток (например, файл планируемых экспериментов),
+    тогда вместо меток возвращается None.
+
+    :param fname: имя файла
+    :type fname: str
+    :param chunk_size: количество строк в блоке
+    :type chunk_size: int
+    :param dtype: тип числовой матрицы (numpy.float64 или numpy.float32)
+    :type dtype: type
+
+    :rtype: generator
+    :return: кортежи (матрица (строки, столбцы), названия столбцов, метки классов или None)
+    """
+    if os.path.splitext(fname)[1].lower() == '.csv':
+        header = pd.read_csv(fname, nrows=1)
+        if LABEL_COLUMN in header.columns or len(header) == 0 or not _is_header(header.iloc[0]):
+            reader = pd.read_csv(fname, chunksize=chunk_size)
+        else:
+            # Краткие обозначения столбцов во второй строке файла
+            reader = pd.read_csv(fname, skiprows=2, header=None, names=list(header.iloc[0]),
+                                 chunksize=chunk_size)
+        for data in reader:
+            labels = None
+            if LABEL_COLUMN in data.columns:
+                labels = data[LABEL_COLUMN].to_numpy(dtype=str)
+                data = data.drop(columns=LABEL_COLUMN)
+            yield data.to_numpy(dtype=dtype), [str(column) for column in data.columns], labels
+        return
+
+    from openpyxl import load_workbook
+    workbook = load_workbook(fname, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        columns = [str(column) for column in next(rows)]
+        block = []
+        if LABEL_COLUMN not in columns:
+            row = next(rows, None)
+            if row is not None and _is_header(row):
+                # Краткие обозначения столбцов во второй строке листа
+                columns = [str(column) for column in row]
+            elif row is not None:
+                block.append(row)
+        label_index = columns.index(LABEL_COLUMN) if LABEL_COLUMN in columns else None
+        numeric = [i for i in range(len(columns)) if i != label_index]
+        for row in rows:
+            if all(value is None for value in row):
+                continue
+            block.append(row)
+            if len(block) == chunk_size:
+                yield _rows_to_chunk(block, numeric, dtype), [columns[i] for i in numeric], \
+                    _rows_to_labels(block, label_index)
+                block = []
+        if block:
+            yield _rows_to_chunk(block, numeric, dtype), [columns[i] for i in numeric], \
+                _rows_to_labels(block, label_index)
+    finally:
+        workbook.close()
+
+
+def _is_header(row):
+    """
+    Функция проверки, является ли строка таблицы строкой заголовков
+
+    :param row: значения строки
+    :type row: list
+
+    :rtype: bool
+    :return: True, если строка содержит нечисловой текст
+    """
+    for value in row:
+        if isinstance(value, str):
+            try:
+                float(value)
+            except ValueError:
+                return True
+    return False
+
+
+def _rows_to_chunk(rows, numeric, dtype=np.float64):
+    """
+    Функция преобразования строк листа Excel в числовую матрицу
+
+    :param rows: строки листа
+    :type rows: list
+    :param numeric: индексы числовых столбцов
+    :type numeric: list
+    :param dtype: тип матрицы
+    :type dtype: type
+
+    :rtype: numpy.ndarray
+    :return: матрица (строки, столбцы)
+    """
+    return np.array([[row[i] for i in numeric] for row in rows], dtype=dtype)
+
+
+def _rows_to_labels(rows, label_index):
+    """
+    Функция извлечения меток классов из строк листа Excel
+
+    :param rows: строки листа
+    :type rows: list
+    :param label_index: индекс столбца меток или None
+    :type label_index: int
+
+    :rtype: numpy.ndarray
+    :return: метки классов или None, если столбца меток нет
+    """
+    if label_index is None:
+        return None
+    return np.array([str(row[label_index]) for row in rows])
+
+
+def label_codes(labels, categories):
+    """
+    Функция кодирования меток классов индексами в списке categories
+
+    В отличие от pandas.Categorical, метки сравниваются как массив строк numpy,
+    поэтому для каждого образца не создается объект str.
+
+    :param labels: метки классов
+    :type labels: numpy.ndarray
+    :param categories: названия классов
+    :type categories: list
+
+    :rtype: numpy.ndarray
+    :return: коды классов int8 (-1 для неизвестных меток)
+    """
+    labels = np.asarray(labels)
+    codes = np.full(len(labels), -1, dtype=np.int8)
+    for code, name in enumerate(categories):
+        codes[labels == name] = code
+    return codes
+
+
+def parse_dataset(fname, dtype=np.float64):
+    """
+    Функция разбора файла данных в числовую матрицу и массив меток
+
+    :param fname: имя файла
+    :type fname: str
+    :param dtype: тип числовой матрицы
+    :type dtype: type
+
+    :rtype: tuple
+    :return: матрица (образцы, столбцы), названия столбцов, метки классов
+    """
+    data = read_table(fname)
+    labels = data[LABEL_COLUMN].to_numpy(dtype=str)
+    data = data.drop(columns=LABEL_COLUMN)
+    values = np.ascontiguousarray(data.to_numpy(dtype=dtype))
+    return values, [str(column) for column in data.columns], labels
+
+
+def load_dataset(fname, use_cache=True, dtype=np.float64):
+    """
+    Функция загрузки датасета с кэшированием результата разбора
+
+    Разобранный датасет сохраняется в несжатый файл (см. cache_name). Кэш считается
+    действительным, если совпадают путь, время изменения и размер файла данных, либо,
+    при другом времени изменения, хэш его содержимого. Числовая матрица загружается
+    из кэша отображением в память без копирования.
+
+    :param fname: имя файла
+    :type fname: str
+    :param use_cache: использовать кэш
+    :type use_cache: bool
+    :param dtype: тип числовой матрицы (numpy.float64 или numpy.float32)
+    :type dtype: type
+
+    :rtype: tuple
+    :return: матрица (образцы, столбцы), названия столбцов, метки классов
+    """
+    if not use_cache:
+        return parse_dataset(fname, dtype)
+    path = os.path.abspath(fname)
+    stat = os.stat(path)
+    cache_file = cache_name(path, dtype)
+    cache = None
+    if os.path.exists(cache_file):
+        try:
+            cache = SomStorage.load_arrays(cache_file, mmap_mode='r', version=CACHE_VERSION)
+        except (OSError, ValueError) as e:
+            print(f"Dataset cache '{cache_file}' is unreadable: {e}")
+    if cache is not None and str(cache['path']) == path and int(cache['size']) == stat.st_size:
+        if int(cache['mtime']) == stat.st_mtime_ns or str(cache['hash']) == file_hash(path):
+            return cache['values'], [str(column) for column in cache['columns']], cache['labels']
+
+    values, columns, labels = parse_dataset(path, dtype)
+    try:
+        SomStorage.save_arrays(cache_file, version=CACHE_VERSION,
+                               path=np.array(path),
+                               mtime=np.array(stat.st_mtime_ns),
+                               size=np.array(stat.st_size),
+                               hash=np.array(file_hash(path)),
+                               values=values,
+                               columns=np.array(columns),
+                               labels=labels)
+    except OSError as e:
+        print(f"Dataset cache '{cache_file}' was not written: {e}")
+    return values, columns, labels
@@ -0,0 +1,154 @@
+import cProfile
+import io
+import json
+import logging
+import pstats
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+logger = logging.getLogger('SOM.profiling')
+
+PROFILE_TOP = 20  # Количество функций с наибольшим временем в отчете cProfile
+
+
+def max_rss_mb():
+    """
+    Функция определения пикового объема памяти процесса
+
+    :rtype: float
+    :return: пиковый резидентный объем памяти, МБ (None, если недоступен)
+    """
+    if resource is None:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class StageProfiler():
+    """
+    Измерение этапов обработки: время, процессорное время, память и, при необходимости, cProfile
+
+    Каждый этап записывается в список records и передается функциям-обработчикам
+    (hooks), например, для вывода в интерфейс или системы мониторинга.
+    """
+
+    def __init__(self, memory=False, profile=False):
+        """
+        Конструктор класса StageProfiler
+        :param memory: измерять пиковый объем памяти этапа через tracemalloc (замедляет
+            код с большим количеством мелких объектов); иначе записывается пиковый объем
+            памяти процесса
+        :type memory: bool
+        :param profile: выполнять этапы под cProfile
+        :type profile: bool
+        """
+        self.memory = memory
+        self.profile = profile
+        self.records = []  # Результаты измерений этапов
+        self.profiles = {}  # Статистика cProfile по этапам
+        self.hooks = []  # Функции hook(запись), вызываемые после каждого этапа
+
+    def add_hook(self, hook):
+        """
+        Функция добавления обработчика результатов этапов
+
+        :param hook: функция hook(запись)
+        :type hook: callable
+        """
+        self.hooks.append(hook)
+
+    def clear(self):
+        """
+        Функция очистки результатов измерений
+        """
+        self.records = []
+        self.profiles = {}
+
+    @contextmanager
+    def stage(self, name):
+        """
+        Контекстный менеджер измерения этапа
+
+        :param name: название этапа
+        :type name: str
+        """
+        tracing = self.memory and not tracemalloc.is_tracing()
+        if tracing:
+            tracemalloc.start()
+        elif self.memory:
+            tracemalloc.reset_peak()
+        profiler = cProfile.Profile() if self.profile else None
+        start, cpu_start = time.perf_counter(), time.process_time()
+        if profiler is not None:
+            profiler.enable()
+        try:
+            yield
+        finally:
+            if profiler is not None:
+                profiler.disable()
+            record = dict(stage=name,
+                          seconds=time.perf_counter() - start,
+                          cpu_seconds=time.process_time() - cpu_start,
+                          peak_mb=tracemalloc.get_traced_memory()[1] / 2 ** 20 if self.memory else None,
+                          max_rss_mb=max_rss_mb())
+            if tracing:
+                tracemalloc.stop()
+            if profiler is not None:
+                self.profiles[name] = pstats.Stats(profiler)
+            self.records.append(record)
+            logger.info("%s: %.3f s wall, %.3f s CPU", name, record['seconds'], record['cpu_seconds'])
+            for hook in self.hooks:
+                hook(record)
+
+    def totals(self):
+        """
+        Функция суммирования времени одноименных этапов
+
+        :rtype: dict
+        :return: словарь {этап: время, с} в порядке первого выполнения
+        """
+        totals = {}
+        for record in self.records:
+            totals[record['stage']] = totals.get(record['stage'], 0.) + record['seconds']
+        return totals
+
+    def profile_report(self, name, top=PROFILE_TOP):
+        """
+        Функция получения отчета cProfile этапа
+
+        :param name: название этапа
+        :type name: str
+        :param top: количество функций с наибольшим накопленным временем
+        :type top: int
+
+        :rtype: str
+        :return: текстовый отчет pstats
+        """
+        stream = io.StringIO()
+        stats = pstats.Stats(stream=stream).add(self.profiles[name])
+        stats.sort_stats('cumulative').print_stats(top)
+        return stream.getvalue()
+
+    def to_json(self, fname):
+        """
+        Функция сохранения результатов измерений в файл JSON
+
+        При включенном cProfile для каждого этапа сохраняются функции с наибольшим
+        накопленным временем.
+
+        :param fname: имя файла
+        :type fname: str
+        """
+        profiles = {}
+        for name, stats in self.profiles.items():
+            functions = sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)[:PROFILE_TOP]
+            profiles[name] = [dict(function=f"{path}:{line}({function})", calls=calls, total_seconds=total,
+                                   cumulative_seconds=cumulative)
+                              for (path, line, function), (_, calls, total, cumulative, _) in functions]
+        with open(fname, 'w', encoding='utf-8') as f:
+            json.dump(dict(stages=self.records, profiles=profiles), f, indent=2, ensure_ascii=False)
@@ -0,0 +1,126 @@
+import numpy as np
+
+
+def gram_matrix(values, chunk_size=None):
+    """
+    Функция вычисления матрицы Грама [X, y, 1]^T [X, y, 1] по блокам строк
+
+    Матрица содержит все достаточные статистики линейной регрессии, поэтому модель
+    можно обучить на данных, не помещающихся в память, и дообучить на новых строках,
+    сложив матрицы.
+
+    :param values: признаки и целевая переменная (последний столбец) формы (образцы, признаки + 1)
+    :type values: numpy.ndarray
+    :param chunk_size: количество строк в блоке (None - все строки сразу)
+    :type chunk_size: int
+
+    :rtype: numpy.ndarray
+    :return: матрица Грама формы (признаки + 2, признаки + 2)
+    """
+    step = chunk_size or max(1, len(values))
+    gram = np.zeros((values.shape[1] + 1, values.shape[1] + 1))
+    for start in range(0, len(values), step):
+        block = np.asarray(values[start:start + step], dtype=np.float64)
+        z = np.hstack([block, np.ones((len(block), 1))])
+        gram += z.T @ z
+    return gram
+
+
+def fit_gram(gram):
+    """
+    Функция обучения линейной регрессии по матрице Грама
+
+    Решается система нормальных уравнений для центрированных данных методом
+    наименьших квадратов, что дает то же решение минимальной нормы, что и
+    sklearn.linear_model.LinearRegression, в том числе для коллинеарных признаков.
+
+    :param gram: матрица Грама [X, y, 1]^T [X, y, 1]
+    :type gram: numpy.ndarray
+
+    :rtype: tuple
+    :return: коэффициенты формы (1, признаки), свободный член формы (1,), коэффициент детерминации
+    """
+    n = gram[-1, -1]
+    mean = gram[-1, :-1] / n
+    cov = gram[:-1, :-1] / n - np.outer(mean, mean)
+    coef = np.linalg.lstsq(cov[:-1, :-1], cov[:-1, -1], rcond=None)[0]
+    intercept = mean[-1] - mean[:-1] @ coef
+    score = coef @ cov[:-1, -1] / cov[-1, -1] if cov[-1, -1] > 0 else 1.0
+    return coef.reshape(1, -1), np.array([intercept]), score
+
+
+def local_gram_matrices(values, nodes, node_count, chunk_size=None):
+    """
+    Функция вычисления матриц Грама [X, y, 1]^T [X, y, 1] для образцов каждого нейрона
+
+    Для каждого элемента верхнего треугольника матрицы суммы по нейронам вычисляются
+    одним вызовом numpy.bincount для всего блока строк. Произведения признаков
+    вычисляются по одному столбцу, поэтому память определяется размером блока данных.
+
+    :param values: признаки и целевая переменная (последний столбец) формы (образцы, признаки + 1)
+    :type values: numpy.ndarray
+    :param nodes: плоские индексы нейронов-победителей образцов
+    :type nodes: numpy.ndarray
+    :param node_count: количество нейронов
+    :type node_count: int
+    :param chunk_size: количество строк в блоке (None - все строки сразу)
+    :type chunk_size: int
+
+    :rtype: numpy.ndarray
+    :return: матрицы Грама формы (нейроны, признаки + 2, признаки + 2)
+    """
+    k = values.shape[1] + 1
+    upper = np.triu_indices(k)
+    grams = np.zeros((node_count, len(upper[0])))
+    step = chunk_size or max(1, len(values))
+    for start in range(0, len(values), step):
+        block = np.asarray(values[start:start + step], dtype=np.float64)
+        z = np.hstack([block, np.ones((len(block), 1))])
+        block_nodes = nodes[start:start + step]
+        product = np.empty(len(z))
+        for j, (a, b) in enumerate(zip(*upper)):
+            np.multiply(z[:, a], z[:, b], out=product)
+            grams[:, j] += np.bincount(block_nodes, weights=product, minlength=node_count)
+    result = np.zeros((node_count, k, k))
+    result[:, upper[0], upper[1]] = grams
+    result[:, upper[1], upper[0]] = grams
+    return result
+
+
+def fit_local_grams(grams, prior_coef, prior_intercept, ridge=1.0, min_weight=1e-9):
+    """
+    Функция пакетного обучения локальных регрессий по матрицам Грама всех нейронов
+
+    Для каждого нейрона решается задача гребневой регрессии со штрафом ridge * ||b - b0||^2,
+    стягивающим коэффициенты b к коэффициентам глобальной модели b0: нейроны с малым
+    количеством образцов получают модель, близкую к глобальной, а нейроны без образцов -
+    глобальную модель. Системы уравнений всех нейронов решаются одним вызовом numpy.linalg.solve.
+
+    :param grams: матрицы Грама формы (нейроны, признаки + 2, признаки + 2)
+    :type grams: numpy.ndarray
+    :param prior_coef: коэффициенты глобальной модели формы (признаки,)
+    :type prior_coef: numpy.ndarray
+    :param prior_intercept: свободный член глобальной модели
+    :type prior_intercept: float
+    :param ridge: коэффициент регуляризации (в единицах количества образцов)
+    :type ridge: float
+    :param min_weight: наименьший вес образцов нейрона, при котором обучается локальная модель
+    :type min_weight: float
+
+    :rtype: tuple
+    :return: коэффициенты формы (нейроны, признаки) и свободные члены формы (нейроны,)
+    """
+    n = grams[:, -1, -1]
+    fitted = n > min_weight
+    weight = np.where(fitted, n, 1.)
+    mean = grams[:, -1, :-1] / weight[:, np.newaxis]
+    cov = grams[:, :-1, :-1] / weight[:, np.newaxis, np.newaxis] - mean[:, :, np.newaxis] * mean[:, np.newaxis, :]
+    p = cov.shape[1] - 1
+    penalty = ridge / weight
+    a = cov[:, :p, :p] + penalty[:, np.newaxis, np.newaxis] * np.eye(p)
+    b = cov[:, :p, p] + penalty[:, np.newaxis] * prior_coef
+    coef = np.linalg.solve(a, b[:, :, np.newaxis])[:, :, 0]
+    intercept = mean[:, p] - np.einsum('ij,ij->i', mean[:, :p], coef)
+    coef[~fitted] = prior_coef
+    intercept[~fitted] = prior_intercept
+    return coef, intercept
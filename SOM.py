@@ -1,4 +1,14 @@
+import copy
+import os
+import tempfile
+
 from minisom import MiniSom
+from BatchSom import BatchSom, find_bmu, quantization_error
+import SomStorage
+import DataLoader
+import Regression
+import Profiling
+from CodebookIndex import CodebookIndex
 
 import pandas as pd
 import numpy as np
@@ -6,14 +16,28 @@ import numpy as np
 from sklearn.preprocessing import MinMaxScaler
 from sklearn.linear_model import LinearRegression
 
-import matplotlib.pyplot as plt
-from matplotlib.patches import RegularPolygon
-from matplotlib import cm, colorbar
-from matplotlib.lines import Line2D
+# Модули matplotlib импортируются в функциях отрисовки: обучение и прогноз без графиков
+# (SomPredict, SomServer, запуск SomApp) не тратят время на их загрузку
+
+
+# Названия классов качества очистки
+LABEL_NAMES = {'неудовл': 'Неудовлетворительно', 'удовл': 'Удовлетворительно', 'хор': 'Хорошо', 'отл': 'Отлично'}
+TARGET_NAMES = list(LABEL_NAMES)  # Порядок классов для кодирования меток
+LABEL_MARKERS = {'неудовл': 'p', 'удовл': 'X', 'хор': 'D', 'отл': 'H'}  # Форма меток
+LABEL_COLORS = {'неудовл': 'darkgreen', 'удовл': 'olive', 'хор': 'yellowgreen', 'отл': 'lightgreen'}  # Цвета меток
+SENSITIVITY_CHUNK = 2 ** 16  # Количество точек сетки анализа чувствительности в блоке
+LOCAL_SIGMA = 1.0  # Радиус соседства, по которому сглаживаются статистики локальных регрессий нейронов
+LOCAL_RIDGE = 1.0  # Коэффициент стягивания локальных регрессий к глобальной (в количестве образцов)
+COMPACT_CHUNK = 2 ** 16  # Количество строк в блоке обработки данных в компактном режиме
 
 
 class SOM():
-    def __init__(self, fname="FlocculantsData.xlsx", epochs=1000, learning_rate=0.5):
+    # Алгоритмы обучения карты: эталонный MiniSom и пакетный BatchSom
+    engines = {'minisom': MiniSom, 'batch': BatchSom}
+
+    def __init__(self, fname="FlocculantsData.xlsx", epochs=1000, learning_rate=0.5, engine='minisom',
+                 chunk_size=None, stream_dir=None, sigma=1.5, grid_size=None, random_seed=None, profiler=None,
+                 index_method='auto', index_dtype=None, local_regression=False, compact=False):
         """
         Конструктор класса SOM
         :param fname: имя файла
@@ -22,33 +46,425 @@ class SOM():
         :type epochs: int
         :param learning_rate: коэффициент обучения
         :type learning_rate: float
+        :param engine: алгоритм обучения ('minisom' или 'batch')
+        :type engine: str
+        :param chunk_size: размер блока потоковой обработки данных (None - весь датасет в памяти)
+        :type chunk_size: int
+        :param stream_dir: каталог для отображаемых в память файлов потоковой обработки
+            (None - временный каталог)
+        :type stream_dir: str
+        :param sigma: радиус соседства
+        :type sigma: float
+        :param grid_size: размер стороны карты (None - выбирается по количеству образцов)
+        :type grid_size: int
+        :param random_seed: начальное значение генератора случайных чисел для весов карты
+        :type random_seed: int
+        :param profiler: измерение этапов обработки (None - время и память без cProfile)
+        :type profiler: Profiling.StageProfiler
+        :param index_method: метод поиска нейронов-победителей обученной карты ('auto', 'brute' или 'kdtree')
+        :type index_method: str
+        :param index_dtype: тип хранения весов в индексе полного перебора ('float64' или 'float32';
+            None - 'float32' в компактном режиме, иначе 'float64')
+        :type index_dtype: str
+        :param local_regression: обучать после карты локальные регрессии нейронов и прогнозировать ими
+        :type local_regression: bool
+        :param compact: компактный режим - данные хранятся и обрабатываются (обучение, поиск
+            победителей) в float32 блоками по COMPACT_CHUNK строк (если не задан chunk_size);
+            достаточные статистики регрессии накапливаются в float64
+        :type compact: bool
         """
+        if engine not in self.engines:
+            raise ValueError(f"Unknown engine '{engine}', expected one of: {', '.join(self.engines)}")
         self.fname = fname
+        self.engine = engine
+        self.chunk_size = chunk_size
+        self.stream_dir = stream_dir
+        self.compact = compact
+        self.dtype = np.float32 if compact else np.float64  # Тип данных и нормированной матрицы
         # Гиперпараметры сети
         self.learning_rate = learning_rate
         self.epochs = epochs
-        self.sigma = 1.5
+        self.sigma = sigma
+        self.grid_size = grid_size
+        self.random_seed = random_seed
         self.grid_rows = 10
         self.grid_columns = 10
         # Датасет
         self.target = None
         self.label_names = None
+        self.columns = None  # Названия признаков и целевой переменной
+        self.values = None  # Ненормированные признаки и целевая переменная
         self.data = None  # Ненормированные данные
         self.y = None  # Целевая переменная
         self.norm_data = None  # Нормированные данные
+        self.scaler = None  # Параметры нормализации
+        # Результаты обучения, вычисляемые один раз после learning()
+        self.winners = None  # Координаты нейронов-победителей для всех образцов
+        self.hits = None  # Количество попаданий образцов в каждый нейрон
+        self.umatrix = None  # U-матрица
+        self.node_labels = None  # Класс качества очистки каждого нейрона
+        self.index_method = index_method
+        self.index_dtype = index_dtype or ('float32' if compact else 'float64')
+        self.index = None  # Индекс весов карты для поиска победителей
+        # Модель регрессии
+        self.model = None
+        self.gram = None  # Достаточные статистики регрессии
+        self.local_regression = local_regression
+        self.local_coef = None  # Коэффициенты локальных регрессий нейронов формы (нейроны, признаки)
+        self.local_intercept = None  # Свободные члены локальных регрессий формы (нейроны,)
+        self.local_weights = None  # Сглаженное количество образцов локальных регрессий нейронов
+        self.feature_index = None  # Индекс весов карты по признакам без скорости осаждения
+        # Флаг прерывания обучения
+        self.cancelled = False
+        # Измерение этапов обработки (чтение, нормализация, обучение, регрессия, отрисовка)
+        self.profiler = profiler if profiler is not None else Profiling.StageProfiler()
+
+    def __createSom__(self, input_len):
+        """
+        Функция создания карты выбранного алгоритма обучения
+
+        :param input_len: количество признаков
+        :type input_len: int
+        """
+        self.som = self.engines[self.engine](self.grid_rows, self.grid_columns, input_len,
+                                             sigma=self.sigma,
+                                             learning_rate=self.learning_rate,
+                                             activation_distance='euclidean',
+                                             topology='hexagonal',
+                                             neighborhood_function='gaussian',
+                                             random_seed=self.random_seed)
 
-    def learning(self):
+    def learning(self, progress=None):
         """
         Функция обучения сети
+
+        :param progress: функция progress(итерация, количество итераций, ошибка квантования),
+            вызываемая примерно на каждом проценте обучения
+        :type progress: callable
+
+        :rtype: bool
+        :return: True, если обучение не было прервано функцией cancel()
         """
+        self.cancelled = False
+        self.profiler.clear()
         self.data_preprocessing()
-        self.som = MiniSom(self.grid_rows, self.grid_columns, self.norm_data.shape[1],
-                           sigma=self.sigma,
-                           learning_rate=self.learning_rate,
-                           activation_distance='euclidean',
-                           topology='hexagonal',
-                           neighborhood_function='gaussian')
-        self.som.train(self.norm_data, self.epochs, verbose=True)
+        step = self.__blockRows__(len(self.norm_data))
+        with self.profiler.stage('train'):
+            self.__createSom__(self.norm_data.shape[1])
+            if progress is None and isinstance(self.som, BatchSom):
+                self.som.train(self.norm_data, self.epochs, verbose=True, chunk_size=step)
+            elif progress is None:
+                # Ошибка квантования MiniSom (verbose) строит матрицу расстояний всех образцов
+                # до всех нейронов, поэтому она вычисляется по блокам
+                self.som.train(self.norm_data, self.epochs)
+                print('\n quantization error:', quantization_error(self.som.get_weights(), self.norm_data, step))
+            elif not self.__train__(progress):
+                return False
+        with self.profiler.stage('map_cache'):
+            self.__cacheMap__()
+        if self.local_regression:
+            self.__fitLocalRegression__()
+        return True
+
+    def __train__(self, progress):
+        """
+        Функция обучения сети с отчетом о ходе обучения
+
+        Для MiniSom повторяется цикл MiniSom.train (последовательный порядок образцов),
+        разбитый на шаги, между которыми проверяется флаг прерывания.
+
+        :param progress: функция progress(итерация, количество итераций, ошибка квантования)
+        :type progress: callable
+
+        :rtype: bool
+        :return: True, если обучение не было прервано
+        """
+        data = self.norm_data
+        step = self.__blockRows__(len(data))
+
+        def report(t, total):
+            if t % max(1, total // 100) == 0 or t == total:
+                progress(t, total, quantization_error(self.som.get_weights(), data, step))
+            return not self.cancelled
+
+        if isinstance(self.som, BatchSom):
+            return self.som.train(data, self.epochs, callback=report, chunk_size=step)
+        for t in range(self.epochs):
+            x = data[t % len(data)]
+            self.som.update(x, self.som.winner(x), t, self.epochs)
+            if not report(t + 1, self.epochs):
+                return False
+        return True
+
+    def cancel(self):
+        """
+        Функция прерывания обучения, запущенного в другом потоке
+        """
+        self.cancelled = True
+
+    def __blockRows__(self, rows):
+        """
+        Функция выбора количества строк блока при обработке данных
+
+        :param rows: количество образцов
+        :type rows: int
+
+        :rtype: int
+        :return: chunk_size, COMPACT_CHUNK в компактном режиме или количество образцов
+        """
+        return self.chunk_size or (COMPACT_CHUNK if self.compact else max(1, rows))
+
+    def __cacheMap__(self):
+        """
+        Функция вычисления нейронов-победителей, карты попаданий и U-матрицы
+
+        Победители для всего датасета находятся одним векторизованным проходом,
+        результаты переиспользуются функциями отрисовки и запросов.
+        """
+        shape = (self.grid_rows, self.grid_columns)
+        self.__buildIndex__()
+        step = self.__blockRows__(len(self.norm_data))
+        self.hits = np.zeros(shape[0] * shape[1], dtype=np.int64)
+        self.winners = np.empty((len(self.norm_data), 2), dtype=np.min_scalar_type(max(shape)))
+        for start in range(0, len(self.norm_data), step):
+            bmu = self.index.query(self.norm_data[start:start + step])
+            self.hits += np.bincount(bmu, minlength=len(self.hits))
+            self.winners[start:start + step] = np.column_stack(np.unravel_index(bmu, shape))
+        self.hits = self.hits.reshape(shape)
+        self.umatrix = self.som.distance_map()
+        self.node_labels = None
+
+    def bmu(self, samples):
+        """
+        Функция поиска нейронов-победителей для ненормированных образцов
+
+        :param samples: образцы (признаки и скорость осаждения)
+        :type samples: numpy.ndarray
+
+        :rtype: numpy.ndarray
+        :return: координаты нейронов-победителей формы (образцы, 2)
+        """
+        if self.index is None:
+            self.__buildIndex__()
+        samples = np.asarray(samples).reshape(-1, self.index.codebook.shape[1])
+        bmu = np.empty(len(samples), dtype=np.intp)
+        step = self.__blockRows__(len(samples))
+        for start in range(0, len(samples), step):
+            bmu[start:start + step] = self.index.query(self.__scale__(samples[start:start + step]))
+        return np.column_stack(np.unravel_index(bmu, (self.grid_rows, self.grid_columns)))
+
+    def __buildIndex__(self):
+        """
+        Функция построения индекса весов обученной карты для поиска победителей
+        """
+        self.index = CodebookIndex(self.som.get_weights(), self.index_method, self.index_dtype)
+        self.feature_index = None
+
+    def check_index(self, data=None):
+        """
+        Функция проверки точности индекса сравнением с полным перебором
+
+        :param data: нормализованные образцы (None - данные обучения)
+        :type data: numpy.ndarray
+
+        :rtype: dict
+        :return: доля совпадений победителей и наибольшее превышение расстояния
+        """
+        if self.index is None:
+            self.__buildIndex__()
+        return self.index.check(self.norm_data if data is None else data)
+
+    def node_classes(self):
+        """
+        Функция определения класса качества очистки для каждого нейрона карты
+
+        Нейрону присваивается наиболее частая метка попавших в него образцов. Нейронам без
+        размеченных образцов присваивается класс ближайшего по весам размеченного нейрона,
+        поэтому класс определен для любого победителя. Результат кэшируется до переобучения.
+
+        :rtype: numpy.ndarray
+        :return: коды классов (индексы TARGET_NAMES) формы (строки, столбцы)
+        """
+        if self.node_labels is None:
+            shape = (self.grid_rows, self.grid_columns)
+            counts = self.__classHits__()
+            labels = np.argmax(counts, axis=1).astype(np.int8)
+            empty = counts.sum(axis=1) == 0
+            if empty.any() and not empty.all():
+                weights = self.som.get_weights()
+                codebook = weights.reshape(-1, weights.shape[2])
+                nearest = find_bmu(codebook[~empty], codebook[empty])
+                labels[empty] = labels[~empty][nearest]
+            self.node_labels = labels.reshape(shape)
+        return self.node_labels
+
+    def __classHits__(self):
+        """
+        Функция подсчета попаданий образцов каждого класса в нейроны карты
+
+        Образцы обрабатываются блоками, поэтому промежуточные массивы индексов
+        не зависят от размера датасета.
+
+        :rtype: numpy.ndarray
+        :return: количество попаданий формы (нейроны, классы)
+        """
+        shape = (self.grid_rows, self.grid_columns)
+        classes = len(TARGET_NAMES)
+        codes = np.asarray(self.target.codes)
+        counts = np.zeros(shape[0] * shape[1] * classes, dtype=np.int64)
+        step = self.__blockRows__(len(codes))
+        for start in range(0, len(codes), step):
+            block = codes[start:start + step]
+            labelled = block >= 0
+            winners = np.asarray(self.winners[start:start + step][labelled], dtype=np.intp)
+            flat = np.ravel_multi_index(tuple(winners.T), shape)
+            counts += np.bincount(flat * classes + block[labelled], minlength=len(counts))
+        return counts.reshape(-1, classes)
+
+    def __updateWinners__(self, old_weights, start):
+        """
+        Функция обновления кэша победителей после дообучения карты
+
+        Для старых образцов, чей победитель не изменил вес, расстояние до победителя прежнее,
+        поэтому достаточно сравнить его с расстояниями до изменившихся нейронов. Полный поиск
+        выполняется только для образцов, победитель которых изменился, и для новых образцов.
+
+        :param old_weights: веса карты до дообучения
+        :type old_weights: numpy.ndarray
+        :param start: индекс первого нового образца
+        :type start: int
+        """
+        shape = (self.grid_rows, self.grid_columns)
+        weights = self.som.get_weights()
+        codebook = weights.reshape(-1, weights.shape[2])
+        self.__buildIndex__()
+        changed = np.flatnonzero(np.any(codebook != old_weights.reshape(codebook.shape), axis=1))
+        winners = np.empty((len(self.norm_data), 2), dtype=self.winners.dtype)
+        winners[:start] = self.winners[:start]
+        step = self.__blockRows__(len(self.norm_data))
+        for begin in range(0, start, step):
+            end = min(begin + step, start)
+            x = np.asarray(self.norm_data[begin:end], dtype=float)
+            bmu = np.ravel_multi_index(tuple(self.winners[begin:end].T.astype(np.intp)), shape)
+            moved = np.isin(bmu, changed)
+            bmu[moved] = self.index.query(x[moved])
+            rest = np.flatnonzero(~moved)
+            if len(changed) > 0 and len(rest) > 0:
+                best = np.einsum('ij,ij->i', x[rest] - codebook[bmu[rest]], x[rest] - codebook[bmu[rest]])
+                candidates = codebook[changed]
+                distances = np.einsum('ij,ij->i', x[rest], x[rest])[:, np.newaxis] - 2 * x[rest] @ candidates.T \
+                    + np.einsum('ij,ij->i', candidates, candidates)
+                nearest = np.argmin(distances, axis=1)
+                closer = distances[np.arange(len(rest)), nearest] < best
+                bmu[rest[closer]] = changed[nearest[closer]]
+            winners[begin:end] = np.column_stack(np.unravel_index(bmu, shape))
+        for begin in range(start, len(self.norm_data), step):
+            bmu = self.index.query(self.norm_data[begin:begin + step])
+            winners[begin:begin + step] = np.column_stack(np.unravel_index(bmu, shape))
+        self.winners = winners
+        flat = np.ravel_multi_index(tuple(winners.T.astype(np.intp)), shape)
+        self.hits = np.bincount(flat, minlength=shape[0] * shape[1]).reshape(shape)
+        self.umatrix = self.som.distance_map()
+        self.node_labels = None
+
+    def update(self, new_rows, labels=None, epochs=None, learning_rate=None, sigma=None, replay=0):
+        """
+        Функция дообучения карты на новых экспериментах без полного переобучения
+
+        Границы нормализации расширяются, если новые значения выходят за них (веса карты
+        пересчитываются в новую шкалу). Затем карта дообучается последовательным алгоритмом
+        MiniSom с малыми коэффициентом обучения и радиусом соседства только на новых данных
+        и, при необходимости, на случайной выборке старых. Кэш победителей обновляется
+        инкрементно, регрессия - сложением матриц Грама.
+
+        :param new_rows: новые эксперименты (признаки и скорость осаждения); таблица может
+            содержать столбец меток 'Type'
+        :type new_rows: pandas.DataFrame or numpy.ndarray
+        :param labels: метки классов новых экспериментов, если их нет в new_rows
+        :type labels: list
+        :param epochs: количество итераций дообучения (None - 10 предъявлений каждого образца)
+        :type epochs: int
+        :param learning_rate: коэффициент обучения (None - десятая часть исходного)
+        :type learning_rate: float
+        :param sigma: радиус соседства (None - треть исходного)
+        :type sigma: float
+        :param replay: количество случайно выбранных старых образцов, добавляемых к новым
+        :type replay: int
+        """
+        if self.norm_data is None or self.winners is None:
+            raise ValueError("update() requires a map trained with learning() in this session")
+        if isinstance(new_rows, pd.DataFrame) and DataLoader.LABEL_COLUMN in new_rows.columns:
+            labels = new_rows[DataLoader.LABEL_COLUMN].to_numpy(dtype=str)
+            new_rows = new_rows.drop(columns=DataLoader.LABEL_COLUMN)
+        new_values = np.asarray(new_rows, dtype=np.float64).reshape(-1, self.values.shape[1])
+        codes = pd.Categorical(labels if labels is not None else [None] * len(new_values),
+                               categories=TARGET_NAMES).codes
+        start = len(self.values)
+
+        # Расширение границ нормализации и перевод весов карты в новую шкалу
+        old_scaler = copy.deepcopy(self.scaler)
+        self.scaler.partial_fit(new_values)
+        rescaled = not (np.array_equal(old_scaler.data_min_, self.scaler.data_min_) and
+                        np.array_equal(old_scaler.data_max_, self.scaler.data_max_))
+        if rescaled:
+            shape = self.som.get_weights().shape
+            weights = old_scaler.inverse_transform(self.som.get_weights().reshape(-1, shape[2]))
+            self.som._weights = self.scaler.transform(weights).reshape(shape)
+
+        # Добавление новых данных
+        columns = list(self.data.columns) + list(self.y.columns)
+        target = pd.Categorical.from_codes(np.concatenate([self.target.codes, codes]), categories=TARGET_NAMES)
+        if self.chunk_size is None:
+            values = np.vstack([self.values, new_values.astype(self.values.dtype)])
+            if rescaled:
+                self.norm_data = self.__scale__(values)
+            else:
+                self.norm_data = np.vstack([self.norm_data, self.__scale__(new_values)])
+        else:
+            with open(self.values.filename, 'ab') as f:
+                new_values.astype(self.values.dtype).tofile(f)
+            values = np.memmap(self.values.filename, dtype=self.values.dtype, mode='r',
+                               shape=(start + len(new_values), self.values.shape[1]))
+            # Нормализованная матрица записывается во временный файл, который затем заменяет
+            # предыдущий. Ссылка на отображение старого файла освобождается до замены
+            # (на Windows отображенный в память файл заменить нельзя).
+            fname = os.path.join(os.path.dirname(self.values.filename), 'norm.npy')
+            norm_data = self.__writeNormalized__(values, fname + '.tmp')
+            del norm_data
+            self.norm_data = None
+            os.replace(fname + '.tmp', fname)
+            self.norm_data = np.load(fname, mmap_mode='r+')
+        self.__setData__(values, columns, target)
+
+        # Дообучение карты на новых данных и выборке старых
+        train_data = np.asarray(self.norm_data[start:], dtype=float)
+        if replay > 0 and start > 0:
+            rng = np.random.default_rng(self.random_seed)
+            old = np.sort(rng.choice(start, size=min(replay, start), replace=False))
+            train_data = np.vstack([train_data, self.norm_data[old]])
+        old_weights = self.som.get_weights().copy()
+        som_learning_rate, som_sigma = self.som._learning_rate, self.som._sigma
+        self.som._learning_rate = learning_rate if learning_rate is not None else self.learning_rate / 10
+        self.som._sigma = sigma if sigma is not None else self.sigma / 3
+        try:
+            with self.profiler.stage('update_train'):
+                MiniSom.train(self.som, train_data, epochs or 10 * len(train_data), random_order=True)
+        finally:
+            self.som._learning_rate, self.som._sigma = som_learning_rate, som_sigma
+
+        # Обновление кэша победителей и регрессии
+        with self.profiler.stage('map_cache'):
+            if rescaled:
+                self.__cacheMap__()
+            else:
+                self.__updateWinners__(old_weights, start)
+        if self.gram is not None:
+            self.gram += Regression.gram_matrix(new_values)
+            coef, intercept, score = Regression.fit_gram(self.gram)
+            print(f"Regression score = {score}")
+            self.__setRegression__(coef, intercept)
+        if self.local_coef is not None:
+            self.__fitLocalRegression__()
 
     def data_preprocessing(self):
         """
@@ -57,26 +473,96 @@ class SOM():
         :rtype: numpy.ndarray
         :return: массив данных
         """
-        # Чтение данных из файла
-        self.data = pd.read_excel(self.fname)
-        self.data = self.data.rename(columns=self.data.iloc[0]).drop(self.data.index[0])
+        if self.chunk_size is not None:
+            self.__streamData__()
+        else:
+            # Чтение данных из файла (или из кэша разобранного файла)
+            with self.profiler.stage('read'):
+                values, columns, labels = DataLoader.load_dataset(self.fname, dtype=self.dtype)
+                codes = DataLoader.label_codes(labels, TARGET_NAMES)
+                self.__setData__(values, columns, pd.Categorical.from_codes(codes, categories=TARGET_NAMES))
+            with self.profiler.stage('normalization'):
+                self.norm_data = self.__normalization__(self.values)  # Нормализация данных
+        # Модель регрессии обучается заново только для новых данных
+        self.model = None
+        self.gram = None
+        self.local_coef = None
+        self.local_intercept = None
+        self.local_weights = None
+
+        # Задание карты оптимального размера
+        size = self.grid_size or int(np.ceil(np.sqrt(5 * np.sqrt(len(self.norm_data)))))
+        self.grid_rows = size
+        self.grid_columns = size
+
+    def __setData__(self, values, columns, target):
+        """
+        Функция разбиения числовой матрицы датасета на признаки и целевую переменную
 
+        Признаки и целевая переменная являются представлениями матрицы values без копирования.
+
+        :param values: признаки и скорость осаждения (последний столбец)
+        :type values: numpy.ndarray
+        :param columns: названия столбцов
+        :type columns: list
+        :param target: метки классов
+        :type target: pandas.Categorical
+        """
+        self.values = values
+        self.columns = list(columns)
         # Извлечение меток данных
-        self.target = self.data['Type'].values
-        self.label_names = {'неудовл': 'Неудовлетворительно', 'удовл': 'Удовлетворительно', 'хор': 'Хорошо',
-                            'отл': 'Отлично'}
+        self.target = target
+        self.label_names = LABEL_NAMES
         # Извлечение целевой переменной
-        self.y = self.data[self.data.columns[-2:-1]]
+        self.y = pd.DataFrame(values[:, -1:], columns=columns[-1:], copy=False)
+        # Признаки для регрессии
+        self.data = pd.DataFrame(values[:, :-1], columns=columns[:-1], copy=False)
 
-        # Выбор данных для построения карты
-        self.data = self.data[self.data.columns[:-1]]
-        self.norm_data = self.__normalization__(self.data)  # Нормализация данных
-        self.data = self.data[self.data.columns[:-1]]
+    def __streamData__(self):
+        """
+        Функция потоковой обработки датасета, не помещающегося в память
 
-        # Задание карты оптимального размера
-        size = np.math.ceil(np.sqrt(5 * np.sqrt(len(self.data))))
-        self.grid_rows = size
-        self.grid_columns = size
+        Файл читается блоками по chunk_size строк. Первый проход записывает числовые данные
+        в отображаемый в память файл и накапливает минимумы и максимумы признаков
+        (MinMaxScaler.partial_fit), второй - записывает нормализованную матрицу в файл .npy.
+        """
+        if self.stream_dir is None:
+            self.stream_tmp = tempfile.TemporaryDirectory(prefix='som_')
+            directory = self.stream_tmp.name
+        else:
+            directory = self.stream_dir
+        raw_name = os.path.join(directory, 'raw.bin')
+        self.scaler = MinMaxScaler(feature_range=(0, 1))
+        codes = []
+        with self.profiler.stage('read'), open(raw_name, 'wb') as f:
+            for values, columns, labels in DataLoader.iter_chunks(self.fname, self.chunk_size, self.dtype):
+                self.scaler.partial_fit(values)
+                values.tofile(f)
+                codes.append(DataLoader.label_codes(labels, TARGET_NAMES) if labels is not None
+                             else np.full(len(values), -1, dtype=np.int8))
+        codes = np.concatenate(codes)
+        values = np.memmap(raw_name, dtype=self.dtype, mode='r', shape=(len(codes), len(columns)))
+        self.__setData__(values, columns, pd.Categorical.from_codes(codes, categories=TARGET_NAMES))
+        with self.profiler.stage('normalization'):
+            self.norm_data = self.__writeNormalized__(values, os.path.join(directory, 'norm.npy'))
+
+    def __writeNormalized__(self, values, fname):
+        """
+        Функция записи нормализованной матрицы в отображаемый в память файл .npy по блокам
+
+        :param values: ненормированные данные
+        :type values: numpy.ndarray
+        :param fname: имя файла .npy
+        :type fname: str
+
+        :rtype: numpy.memmap
+        :return: нормализованные данные
+        """
+        norm_data = np.lib.format.open_memmap(fname, mode='w+', dtype=values.dtype, shape=values.shape)
+        for start in range(0, len(values), self.chunk_size):
+            norm_data[start:start + self.chunk_size] = self.__scale__(values[start:start + self.chunk_size])
+        norm_data.flush()
+        return norm_data
 
     def __normalization__(self, data):
         """
@@ -87,138 +573,174 @@ class SOM():
         :rtype: numpy.ndarray
         :return: нормализованные данные
         """
-        sc = MinMaxScaler(feature_range=(0, 1))
-        sc.fit(data)
-        data = sc.fit_transform(data)
-        return data
+        self.scaler = MinMaxScaler(feature_range=(0, 1))
+        self.scaler.fit(data)
+        return self.__scale__(data)
 
-    def plot_som(self):
+    def __scale__(self, values):
         """
-        Функция отрисовки карты
+        Функция нормализации данных параметрами self.scaler
+
+        Результат, как и MinMaxScaler.transform, равен values * scale_ + min_, но вычисляется
+        на месте в единственной копии данных типа self.dtype.
+
+        :param values: ненормированные данные
+        :type values: numpy.ndarray
+
+        :rtype: numpy.ndarray
+        :return: нормализованные данные
+        """
+        norm_data = np.array(values, dtype=self.dtype)
+        norm_data *= self.scaler.scale_
+        norm_data += self.scaler.min_
+        return norm_data
+
+    def __drawMap__(self, ax, legend_markersize=5, legend_fontsize=8):
+        """
+        Функция отрисовки гексагональной карты с маркерами данных
+
+        Все шестиугольники сетки рисуются одной коллекцией PolyCollection, цвет
+        которой задается U-матрицей, а маркеры каждого класса - одним вызовом scatter
+        по одному маркеру на нейрон, в который попал хотя бы один образец класса.
+
+        :param ax: оси для отрисовки
+        :type ax: matplotlib.axes.Axes
+        :param legend_markersize: размер маркеров в легенде
+        :type legend_markersize: int
+        :param legend_fontsize: размер шрифта легенды
+        :type legend_fontsize: int
         """
+        from matplotlib import cm
+        from matplotlib.collections import PolyCollection
+        from matplotlib.lines import Line2D
+
         xx, yy = self.som.get_euclidean_coordinates()
-        umatrix = self.som.distance_map()
         weights = self.som.get_weights()
 
-        w_x, w_y = zip(*[self.som.winner(d) for d in self.norm_data])
-        w_x = np.array(w_x)
-        w_y = np.array(w_y)
-
         # Маркеры данных
-        self.markers = {'неудовл': 'p', 'удовл': 'X', 'хор': 'D', 'отл': 'H'}  # Форма меток
-        self.colors = {'неудовл': 'darkgreen', 'удовл': 'olive', 'хор': 'yellowgreen',
-                       'отл': 'lightgreen'}  # Цвета меток
+        self.markers = LABEL_MARKERS  # Форма меток
+        self.colors = LABEL_COLORS  # Цвета меток
         map_style = cm.Wistia  # Цветовая карта
         alpha = 1  # Прозрачность
 
-        # Создание фигуры
-        fig = plt.figure(figsize=(16, 8))
-        fig.suptitle("Самоорганизующаяся карта Кохонена", fontsize=20)
-
-        # Самоорганизующаяся карта Кохонена
-        ax1 = fig.add_subplot(121)
-        ax1.set_aspect('equal')
-        # Создание поля
-        for i in range(weights.shape[0]):
-            for j in range(weights.shape[1]):
-                wy = yy[(i, j)] * np.sqrt(3) / 2
-                hex = RegularPolygon((xx[(i, j)], wy),
-                                     numVertices=6,
-                                     radius=0.9 / np.sqrt(3),
-                                     facecolor=map_style(umatrix[i, j]),
-                                     alpha=alpha,
-                                     edgecolor='gray')
-                ax1.add_patch(hex)
-        for cnt, x in enumerate(self.norm_data):
-            # Нейрон-победитель
-            w = self.som.winner(x)
-            # Размещение маркера на позицию победившего нейрона
-            wx, wy = self.som.convert_map_to_euclidean(w)
-            wy = wy * np.sqrt(3) / 2
-            ax1.plot(wx, wy,
-                     self.markers[self.target[cnt]],
-                     markerfacecolor=self.colors[self.target[cnt]],
-                     markeredgecolor=self.colors[self.target[cnt]],
-                     markersize=12,
-                     markeredgewidth=2)
+        ax.set_aspect('equal')
+        # Создание поля: вершины всех шестиугольников
+        theta = np.pi / 2 + np.arange(6) * np.pi / 3
+        radius = 0.9 / np.sqrt(3)
+        centers = np.column_stack((xx.ravel(), yy.ravel() * np.sqrt(3) / 2))
+        vertices = centers[:, np.newaxis, :] + radius * np.column_stack((np.cos(theta), np.sin(theta)))
+        hexagons = PolyCollection(vertices, cmap=map_style, alpha=alpha, edgecolors='gray')
+        hexagons.set_array(self.umatrix.ravel())
+        hexagons.set_clim(0, 1)
+        ax.add_collection(hexagons)
+        # Размещение маркеров на позиции победивших нейронов
+        counts = self.__classHits__()
+        target_names = ['неудовл', 'удовл', 'хор', 'отл']
+        for c in target_names:
+            idx_target = counts[:, TARGET_NAMES.index(c)] > 0
+            ax.scatter(centers[idx_target, 0], centers[idx_target, 1],
+                       marker=self.markers[c],
+                       c=self.colors[c],
+                       edgecolors=self.colors[c],
+                       s=12 ** 2,
+                       linewidths=2)
+        ax.autoscale_view()
         # Настройка делений осей
         xrange = np.arange(weights.shape[0] + 1)
         yrange = np.arange(weights.shape[1] + 1)
-        ax1.set_xticks(xrange - 0.5, xrange)
-        ax1.set_yticks(yrange * np.sqrt(3) / 2, yrange)
+        ax.set_xticks(xrange - 0.5, xrange)
+        ax.set_yticks(yrange * np.sqrt(3) / 2, yrange)
         # Настройка легенды
         legend_elements = []
-        target_names = ['неудовл', 'удовл', 'хор', 'отл']
         for i in target_names:
             legend_elements.append(
                 Line2D([0], [0], marker=self.markers[i], color=self.colors[i], label=self.label_names[i],
-                       markerfacecolor=self.colors[i], markersize=5, linestyle='None',
+                       markerfacecolor=self.colors[i], markersize=legend_markersize, linestyle='None',
                        markeredgewidth=2))
-        ax1.legend(handles=legend_elements, loc='upper left', ncol=1, fontsize=8)
+        ax.legend(handles=legend_elements, loc='upper left', ncol=1, fontsize=legend_fontsize)
+        return hexagons
 
-        # Отрисовка датасета на карте
-        ax2 = fig.add_subplot(122)
-        ax2.set_aspect('equal')
-        plt.pcolor(self.som.distance_map().T, cmap=map_style, alpha=alpha)
+    def __drawDistribution__(self, ax, s=40):
+        """
+        Функция отрисовки распределения данных по карте: U-матрица и образцы на позициях
+        нейронов-победителей со случайным смещением внутри клетки
+
+        :param ax: оси для отрисовки
+        :type ax: matplotlib.axes.Axes
+        :param s: размер маркеров образцов
+        :type s: int
+
+        :rtype: matplotlib.collections.QuadMesh
+        :return: U-матрица (для цветовой шкалы)
+        """
+        from matplotlib import cm
+
+        w_x, w_y = self.winners.T
+        map_style = cm.Wistia  # Цветовая карта
+        alpha = 1  # Прозрачность
+
+        ax.set_aspect('equal')
+        mesh = ax.pcolormesh(self.umatrix.T, cmap=map_style, alpha=alpha)
         # Распределение данных по карте
-        for c in target_names:
+        for c in ['неудовл', 'удовл', 'хор', 'отл']:
             idx_target = self.target == c
-            ax2.scatter(w_x[idx_target] + .5 + (np.random.rand(np.sum(idx_target)) - .5) * .8,
-                        w_y[idx_target] + .5 + (np.random.rand(np.sum(idx_target)) - .5) * .8,
-                        s=40, c=self.colors[c], label=self.label_names[c])
+            ax.scatter(w_x[idx_target] + .5 + (np.random.rand(np.sum(idx_target)) - .5) * .8,
+                       w_y[idx_target] + .5 + (np.random.rand(np.sum(idx_target)) - .5) * .8,
+                       s=s, c=LABEL_COLORS[c], label=self.label_names[c])
         # Настройка легенды
-        ax2.legend(loc='upper left', ncol=1, fontsize=8)
+        ax.legend(loc='upper left', ncol=1, fontsize=8)
+        return mesh
+
+    def plot_som(self):
+        """
+        Функция отрисовки карты
+        """
+        import matplotlib.pyplot as plt
+
+        # Создание фигуры
+        fig = plt.figure(figsize=(16, 8))
+        fig.suptitle("Самоорганизующаяся карта Кохонена", fontsize=20)
+
+        # Самоорганизующаяся карта Кохонена
+        ax1 = fig.add_subplot(121)
+        with self.profiler.stage('plot'):
+            self.__drawMap__(ax1)
+
+            # Отрисовка датасета на карте
+            ax2 = fig.add_subplot(122)
+            mesh = self.__drawDistribution__(ax2)
 
         # Отрисовка цветовой шкалы
-        plt.colorbar()
+        fig.colorbar(mesh, ax=ax2)
         # plt.grid()
         plt.show()
 
-    def plot_sample(self):
-        xx, yy = self.som.get_euclidean_coordinates()
-        umatrix = self.som.distance_map()
-        weights = self.som.get_weights()
+    def sample_position(self, x_sample):
+        """
+        Функция вычисления положения эксперимента на изображении карты
 
-        w_test = self.som.winner(self.x_sample)
-        x_test, y_test = self.som.convert_map_to_euclidean(w_test)
-        y_test = y_test * np.sqrt(3) / 2
+        :param x_sample: эксперимент (признаки и скорость осаждения)
+        :type x_sample: numpy.ndarray
 
-        # Маркеры данных
-        self.markers = {'неудовл': 'p', 'удовл': 'X', 'хор': 'D', 'отл': 'H'}  # Форма меток
-        self.colors = {'неудовл': 'darkgreen', 'удовл': 'olive', 'хор': 'yellowgreen',
-                       'отл': 'lightgreen'}  # Цвета меток
-        map_style = cm.Wistia  # Цветовая карта
-        alpha = 1  # Прозрачность
+        :rtype: tuple
+        :return: координаты центра нейрона-победителя в осях __drawMap__
+        """
+        w_test = self.bmu(x_sample)[0]
+        x_test, y_test = self.som.convert_map_to_euclidean(tuple(w_test))
+        return x_test, y_test * np.sqrt(3) / 2
+
+    def plot_sample(self):
+        import matplotlib.pyplot as plt
+
+        x_test, y_test = self.sample_position(self.x_sample)
 
         # Создание фигуры
         fig = plt.figure(figsize=(8, 8))
 
         # Самоорганизующаяся карта Кохонена
         ax = fig.add_subplot(111)
-        ax.set_aspect('equal')
-        # Создание поля
-        for i in range(weights.shape[0]):
-            for j in range(weights.shape[1]):
-                wy = yy[(i, j)] * np.sqrt(3) / 2
-                hex = RegularPolygon((xx[(i, j)], wy),
-                                     numVertices=6,
-                                     radius=0.9 / np.sqrt(3),
-                                     facecolor=map_style(umatrix[i, j]),
-                                     alpha=alpha,
-                                     edgecolor='gray')
-                ax.add_patch(hex)
-        for cnt, x in enumerate(self.norm_data):
-            # Нейрон-победитель
-            w = self.som.winner(x)
-            # Размещение маркера на позицию победившего нейрона
-            wx, wy = self.som.convert_map_to_euclidean(w)
-            wy = wy * np.sqrt(3) / 2
-            ax.plot(wx, wy,
-                    self.markers[self.target[cnt]],
-                    markerfacecolor=self.colors[self.target[cnt]],
-                    markeredgecolor=self.colors[self.target[cnt]],
-                    markersize=12,
-                    markeredgewidth=2)
+        with self.profiler.stage('plot'):
+            self.__drawMap__(ax, legend_markersize=8, legend_fontsize=10)
 
         # Эксперимент
         ax.plot(x_test, y_test,
@@ -226,37 +748,304 @@ class SOM():
                 markerfacecolor='black',
                 markeredgecolor='black',
                 markersize=12)
-        # Настройка делений осей
-        xrange = np.arange(weights.shape[0] + 1)
-        yrange = np.arange(weights.shape[1] + 1)
-        ax.set_xticks(xrange - 0.5, xrange)
-        ax.set_yticks(yrange * np.sqrt(3) / 2, yrange)
-        # Настройка легенды
-        legend_elements = []
-        target_names = ['неудовл', 'удовл', 'хор', 'отл']
-        for i in target_names:
-            legend_elements.append(
-                Line2D([0], [0], marker=self.markers[i], color=self.colors[i], label=self.label_names[i],
-                       markerfacecolor=self.colors[i], markersize=8, linestyle='None',
-                       markeredgewidth=2))
-        ax.legend(handles=legend_elements, loc='upper left', ncol=1, fontsize=10)
         plt.show()
 
+    def __fitRegression__(self):
+        """
+        Функция обучения модели линейной регрессии
+
+        Модель обучается один раз для загруженного датасета и хранится до его изменения.
+        Матрица Грама вычисляется по блокам строк, поэтому данные могут не помещаться в память.
+        """
+        with self.profiler.stage('regression'):
+            self.gram = Regression.gram_matrix(self.values, self.__blockRows__(len(self.values)))
+            coef, intercept, score = Regression.fit_gram(self.gram)
+        print(f"Regression score = {score}")
+        self.__setRegression__(coef, intercept)
+
+    def __setRegression__(self, coef, intercept):
+        """
+        Функция создания модели LinearRegression с заданными коэффициентами
+
+        :param coef: коэффициенты формы (1, признаки)
+        :type coef: numpy.ndarray
+        :param intercept: свободный член формы (1,)
+        :type intercept: numpy.ndarray
+        """
+        self.model = LinearRegression()
+        self.model.coef_ = np.asarray(coef)
+        self.model.intercept_ = np.asarray(intercept)
+        self.model.n_features_in_ = self.model.coef_.shape[-1]
+
+    def __predict__(self, samples):
+        """
+        Функция прогноза скорости осаждения обученной моделью регрессии
+
+        :param samples: образцы формы (образцы, признаки)
+        :type samples: numpy.ndarray
+
+        :rtype: numpy.ndarray
+        :return: прогноз формы (образцы, 1)
+        """
+        if self.local_coef is not None:
+            return self.__predictLocal__(samples)[:, np.newaxis]
+        if self.model is None:
+            self.__fitRegression__()
+        return np.dot(samples, self.model.coef_.T) + self.model.intercept_
+
+    def __fitLocalRegression__(self, sigma=LOCAL_SIGMA, ridge=LOCAL_RIDGE):
+        """
+        Функция обучения таблицы локальных регрессий нейронов карты
+
+        Образцы распределяются по нейронам по весам признаков (скорость осаждения при прогнозе
+        неизвестна). Для каждого нейрона вычисляется матрица Грама его образцов, матрицы
+        сглаживаются по гауссову соседству радиуса sigma на карте, и регрессии всех нейронов
+        решаются одним пакетным вызовом (Regression.fit_local_grams) со стягиванием
+        к глобальной модели. Прогноз сводится к поиску нейрона и скалярному произведению.
+
+        :param sigma: радиус соседства сглаживания статистик (0 - только образцы нейрона)
+        :type sigma: float
+        :param ridge: коэффициент стягивания к глобальной регрессии (в количестве образцов)
+        :type ridge: float
+        """
+        if self.model is None:
+            self.__fitRegression__()
+        with self.profiler.stage('local_regression'):
+            self.__buildFeatureIndex__()
+            p = self.values.shape[1] - 1
+            nodes = self.grid_rows * self.grid_columns
+            scale, offset = self.scaler.scale_[:p], self.scaler.min_[:p]
+            # Произведения признаков занимают в (p + 2)(p + 3)/2 раз больше памяти, чем блок данных
+            step = min(self.__blockRows__(len(self.norm_data)), COMPACT_CHUNK)
+            grams = np.zeros((nodes, p + 2, p + 2))
+            for start in range(0, len(self.norm_data), step):
+                features = self.norm_data[start:start + step, :p]
+                block = np.hstack([features, self.values[start:start + step, p:]])
+                grams += Regression.local_gram_matrices(block, self.feature_index.query(features), nodes)
+            if sigma > 0:
+                grams = BatchSom.neighborhood_dot(self.som, grams.reshape(self.grid_rows, self.grid_columns, -1),
+                                                  sigma).reshape(nodes, p + 2, p + 2)
+            # Регрессии обучаются на нормированных признаках и переводятся в ненормированные:
+            # x_norm = x * scale + offset
+            prior_coef = self.model.coef_[0] / scale
+            prior_intercept = self.model.intercept_[0] - np.dot(offset, prior_coef)
+            coef, intercept = Regression.fit_local_grams(grams, prior_coef, prior_intercept, ridge)
+            self.local_weights = grams[:, -1, -1]
+            self.local_coef = coef * scale
+            self.local_intercept = intercept + np.dot(coef, offset)
+
+    def check_local_regression(self, min_weight=1e-9):
+        """
+        Функция проверки таблицы локальных регрессий для нейронов без образцов
+
+        Нейроны, на которых локальная регрессия не обучалась, должны прогнозировать так же,
+        как глобальная модель. Прогнозы сравниваются в точках весов этих нейронов.
+
+        :param min_weight: наименьший вес образцов обученного нейрона (как в Regression.fit_local_grams)
+        :type min_weight: float
+
+        :rtype: dict
+        :return: количество нейронов без образцов и наибольшее отличие прогноза от глобальной модели
+        """
+        if self.local_weights is None:
+            raise ValueError("check_local_regression() requires local regressions fitted in this session")
+        empty = np.flatnonzero(self.local_weights <= min_weight)
+        p = self.local_coef.shape[1]
+        features = self.som.get_weights().reshape(-1, p + 1)[empty, :p]
+        samples = (features - self.scaler.min_[:p]) / self.scaler.scale_[:p]
+        local = np.einsum('ij,ij->i', samples, self.local_coef[empty]) + self.local_intercept[empty]
+        expected = np.dot(samples, self.model.coef_[0]) + self.model.intercept_[0]
+        return dict(empty_nodes=len(empty), max_difference=float(np.max(np.abs(local - expected), initial=0.)))
+
+    def __buildFeatureIndex__(self):
+        """
+        Функция построения индекса весов карты по признакам для локальных регрессий
+        """
+        self.feature_index = CodebookIndex(self.som.get_weights()[..., :-1], self.index_method, self.index_dtype)
+
+    def __predictLocal__(self, samples):
+        """
+        Функция прогноза скорости осаждения локальными регрессиями нейронов
+
+        :param samples: образцы формы (образцы, признаки)
+        :type samples: numpy.ndarray
+
+        :rtype: numpy.ndarray
+        :return: прогноз формы (образцы,)
+        """
+        if self.feature_index is None:
+            self.__buildFeatureIndex__()
+        samples = np.asarray(samples, dtype=float).reshape(-1, self.local_coef.shape[1])
+        p = samples.shape[1]
+        node = self.feature_index.query(samples * self.scaler.scale_[:p] + self.scaler.min_[:p])
+        return np.einsum('ij,ij->i', samples, self.local_coef[node]) + self.local_intercept[node]
+
     def regression(self, x_sample):
         if not type(x_sample) == np.ndarray:
             self.x_sample = np.array(x_sample).reshape(1, -1)
         else:
             self.x_sample = x_sample
-        model = LinearRegression()
-        model.fit(self.data.to_numpy(), self.y)
-        print(f"Regression score = {model.score(self.data.to_numpy(), self.y)}")
-        self.y_pred = model.predict(self.x_sample)
+        self.y_pred = self.__predict__(self.x_sample)
         self.x_sample = np.append(self.x_sample, self.y_pred)
 
+    def predict_many(self, samples):
+        """
+        Функция прогноза скорости осаждения и поиска нейронов-победителей для набора экспериментов
+
+        :param samples: эксперименты формы (эксперименты, признаки)
+        :type samples: numpy.ndarray
+
+        :rtype: tuple
+        :return: скорости осаждения формы (эксперименты,) и координаты нейронов-победителей
+            формы (эксперименты, 2)
+        """
+        samples = np.asarray(samples)
+        velocity = np.empty(len(samples))
+        bmu = np.empty((len(samples), 2), dtype=np.intp)
+        step = self.__blockRows__(len(samples))
+        for start in range(0, len(samples), step):
+            block = np.asarray(samples[start:start + step], dtype=float)
+            y_pred = self.__predict__(block)
+            velocity[start:start + step] = y_pred[:, 0]
+            bmu[start:start + step] = self.bmu(np.hstack([block, y_pred]))
+        return velocity, bmu
+
+    def sensitivity(self, base, grid, chunk_size=SENSITIVITY_CHUNK):
+        """
+        Функция анализа чувствительности по сетке значений двух или трех параметров эксперимента
+
+        Для всех сочетаний значений выбранных параметров (остальные параметры равны base)
+        вычисляются скорость осаждения и класс качества очистки нейрона-победителя.
+        Точки сетки обрабатываются блоками по chunk_size, поэтому объем памяти определяется
+        размером блока и результата, а не количеством сочетаний.
+
+        :param base: эксперимент (признаки) со значениями неизменяемых параметров
+        :type base: list
+        :param grid: словарь {индекс или название признака: значения}
+        :type grid: dict
+        :param chunk_size: количество точек сетки в блоке
+        :type chunk_size: int
+
+        :rtype: tuple
+        :return: скорости осаждения и коды классов (индексы TARGET_NAMES) формы
+            (len(значения 1), len(значения 2)[, len(значения 3)])
+        """
+        if len(grid) not in (2, 3):
+            raise ValueError(f"Sensitivity grid needs 2 or 3 parameters, got {len(grid)}")
+        base = np.asarray(base, dtype=float).ravel()
+        indices = [self.columns.index(key) if isinstance(key, str) else int(key) for key in grid]
+        axes = [np.asarray(values, dtype=float).ravel() for values in grid.values()]
+        shape = tuple(len(values) for values in axes)
+        total = int(np.prod(shape))
+        classes = self.node_classes()
+        velocity = np.empty(total)
+        clusters = np.empty(total, dtype=np.int8)
+        for start in range(0, total, chunk_size):
+            points = np.arange(start, min(start + chunk_size, total))
+            samples = np.tile(base, (len(points), 1))
+            for index, values, position in zip(indices, axes, np.unravel_index(points, shape)):
+                samples[:, index] = values[position]
+            velocity[points], bmu = self.predict_many(samples)
+            clusters[points] = classes[bmu[:, 0], bmu[:, 1]]
+        return velocity.reshape(shape), clusters.reshape(shape)
+
+    def save(self, fname):
+        """
+        Функция сохранения обученной модели в файл .npz
+
+        Сохраняются веса карты, параметры нормализации, коэффициенты регрессии (и таблица
+        локальных регрессий, если она обучена), размер сетки, гиперпараметры, названия
+        столбцов и кэш победителей для отрисовки карты. Файл заменяется атомарно
+        (SomStorage.save_arrays), поэтому модель можно сохранить в файл, из которого
+        она загружена с отображением в память.
+
+        :param fname: имя файла (расширение .npz добавляется, если его нет)
+        :type fname: str
+
+        :rtype: str
+        :return: имя записанного файла
+        """
+        if self.model is None:
+            self.__fitRegression__()
+        local = {}
+        if self.local_coef is not None:
+            local = dict(local_coef=self.local_coef, local_intercept=self.local_intercept)
+        return SomStorage.save_arrays(fname,
+                                      weights=self.som.get_weights(),
+                                      grid=np.array([self.grid_rows, self.grid_columns]),
+                                      engine=np.array(self.engine),
+                                      sigma=np.array(self.sigma),
+                                      learning_rate=np.array(self.learning_rate),
+                                      epochs=np.array(self.epochs),
+                                      data_min=self.scaler.data_min_,
+                                      data_max=self.scaler.data_max_,
+                                      coef=self.model.coef_,
+                                      intercept=self.model.intercept_,
+                                      winners=self.winners,
+                                      hits=self.hits,
+                                      umatrix=self.umatrix,
+                                      target=np.asarray(self.target, dtype=str),
+                                      columns=np.array(self.columns, dtype=str),
+                                      index_method=np.array(self.index_method),
+                                      index_dtype=np.array(self.index_dtype),
+                                      node_labels=self.node_classes(),
+                                      **local)
+
+    @classmethod
+    def load(cls, fname, mmap_mode=None):
+        """
+        Функция загрузки обученной модели из файла .npz
+
+        :param fname: имя файла (расширение .npz добавляется, если его нет)
+        :type fname: str
+        :param mmap_mode: режим отображения массивов в память ('r', 'c') или None
+        :type mmap_mode: str
+
+        :rtype: SOM
+        :return: обученная модель
+        """
+        arrays = SomStorage.load_arrays(fname, mmap_mode)
+        som = cls(fname, int(arrays['epochs']), float(arrays['learning_rate']), str(arrays['engine']))
+        som.sigma = float(arrays['sigma'])
+        som.grid_rows, som.grid_columns = (int(size) for size in arrays['grid'])
+        som.label_names = LABEL_NAMES
+        # Параметры нормализации восстанавливаются по минимумам и максимумам признаков
+        som.scaler = MinMaxScaler(feature_range=(0, 1))
+        som.scaler.fit(np.vstack([arrays['data_min'], arrays['data_max']]))
+        # Коэффициенты регрессии
+        som.__setRegression__(arrays['coef'], arrays['intercept'])
+        # Карта
+        weights = arrays['weights']
+        som.__createSom__(weights.shape[2])
+        som.som._weights = weights
+        som.winners = arrays['winners']
+        som.hits = arrays['hits']
+        som.umatrix = arrays['umatrix']
+        som.target = pd.Categorical(arrays['target'], categories=TARGET_NAMES)
+        if 'columns' in arrays:
+            som.columns = [str(column) for column in arrays['columns']]
+        if 'index_method' in arrays:
+            som.index_method = str(arrays['index_method'])
+            som.index_dtype = str(arrays['index_dtype'])
+        if 'node_labels' in arrays:
+            som.node_labels = np.asarray(arrays['node_labels'])
+        if 'local_coef' in arrays:
+            som.local_regression = True
+            som.local_coef = arrays['local_coef']
+            som.local_intercept = arrays['local_intercept']
+        som.__buildIndex__()
+        return som
+
 
 if __name__ == "__main__":
-    som = SOM()
-    som.learning()
+    import sys
+
+    if len(sys.argv) > 1:
+        # Загрузка ранее обученной модели
+        som = SOM.load(sys.argv[1])
+    else:
+        som = SOM()
+        som.learning()
     x = [5.2, 0.00075, 0.021, 9, 120, 21, 85, 92]
     som.regression(x)
     # print(f"Prediction = {float(som.y_pred)}")
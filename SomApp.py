@@ -1,9 +1,37 @@
-import SOM
+import importlib
+import logging
+import sys
+import threading
+import time
+import zipfile
 
 from PyQt5 import QtGui
-from PyQt5.QtCore import Qt
+from PyQt5.QtCore import Qt, QThread, QTimer, pyqtSignal
 from PyQt5.QtWidgets import QApplication, QMainWindow, QPushButton, QWidget, QSpinBox, \
-    QGridLayout, QMenuBar, QMessageBox, QLabel, QDoubleSpinBox, QFileDialog, QCheckBox, QGroupBox, QVBoxLayout
+    QGridLayout, QMenuBar, QMessageBox, QLabel, QDoubleSpinBox, QFileDialog, QCheckBox, QGroupBox, QVBoxLayout, \
+    QComboBox, QProgressBar, QHBoxLayout, QDialog
+
+# Модуль SOM (minisom, pandas, sklearn) и matplotlib импортируются не при запуске, а при первом
+# обращении или в фоновом потоке после отображения окна
+HEAVY_MODULES = ['SOM', 'SomCanvas', 'matplotlib.collections', 'matplotlib.lines']
+# Названия этапов обработки для вывода времени в интерфейсе
+STAGE_NAMES = {'read': "чтение", 'normalization': "нормализация", 'train': "обучение", 'map_cache': "победители",
+               'regression': "регрессия", 'local_regression': "локальная регрессия", 'update_train': "дообучение",
+               'plot': "отрисовка"}
+
+
+def preload_modules():
+    """
+    Функция фонового импорта тяжелых модулей
+
+    Запускается после первой отрисовки окна. Если пользователь обратится к модулю раньше
+    окончания загрузки, импорт в главном потоке дождется ее завершения.
+    """
+    def run():
+        for name in HEAVY_MODULES:
+            importlib.import_module(name)
+
+    threading.Thread(target=run, daemon=True).start()
 
 
 class MainWindow(QMainWindow):
@@ -16,7 +44,7 @@ class MainWindow(QMainWindow):
         self.setWindowTitle("Анализ флокулянтов")
         self.setMinimumSize(500, 500)
         self.resize(650, 500)
-        self.setMaximumSize(800, 800)
+        self.setMaximumSize(1600, 900)
         # Генерация меню
         self.createMenu()
         # Установка центрального виджета
@@ -28,10 +56,20 @@ class MainWindow(QMainWindow):
         # Настройка меню
         self.menuBar = QMenuBar(self)
         self.setMenuBar(self.menuBar)
+        # Меню "Файл"
+        menu_file = self.menuBar.addMenu("Файл")
+        menu_file.addAction("Открыть обученную модель", self.open_model, shortcut='Ctrl+O')
+        menu_file.addAction("Сохранить модель", self.save_model, shortcut='Ctrl+S')
         # Меню "О программе"
         menu_about = self.menuBar.addMenu("О программе")
         menu_about.addAction("Информация", self.about, shortcut='F1')
 
+    def open_model(self):
+        self.central.open_model_dialog()
+
+    def save_model(self):
+        self.central.save_model_dialog()
+
     def about(self):
         text = "    Авторы: Мусина С.А., Миянов М.Р.\n" \
                "    Программа создана в рамках работы по созданию алгоритмов" \
@@ -40,10 +78,133 @@ class MainWindow(QMainWindow):
         QMessageBox.about(self, "Информация", text)
 
 
+class TrainingThread(QThread):
+    """
+    Поток обучения сети, не блокирующий интерфейс
+    """
+    progress = pyqtSignal(int, int, float)  # Итерация, количество итераций, ошибка квантования
+
+    def __init__(self, som, parent=None):
+        QThread.__init__(self, parent)
+        self.som = som
+        self.completed = False  # Обучение завершено без прерывания
+        self.error = None  # Ошибка, возникшая при обучении
+
+    def run(self):
+        try:
+            self.completed = self.som.learning(self.progress.emit)
+        except Exception as e:
+            self.error = e
+
+
+class SensitivityDialog(QDialog):
+    """
+    Окно анализа чувствительности скорости осаждения и класса качества очистки
+    к двум параметрам эксперимента
+    """
+
+    def __init__(self, som, names, spins, parent=None):
+        QDialog.__init__(self, parent)
+        self.som = som  # Обученная модель
+        self.spins = spins  # Спин-боксы параметров эксперимента, задающие неизменяемые значения
+        self.setWindowTitle("Анализ чувствительности")
+        self.resize(1000, 600)
+        # Выбор параметра, диапазона и количества значений для каждой оси
+        self.axis_widgets = []
+        axes_grid = QGridLayout()
+        for row, title in enumerate(["Параметр по оси X: ", "Параметр по оси Y: "]):
+            combo = QComboBox(self)
+            combo.addItems(names)
+            combo.setCurrentIndex(row)
+            low_spin = QDoubleSpinBox(self)
+            high_spin = QDoubleSpinBox(self)
+            steps_spin = QSpinBox(self)
+            steps_spin.setRange(2, 2000)
+            steps_spin.setValue(100)
+            combo.currentIndexChanged.connect(
+                lambda index, low=low_spin, high=high_spin: self.__setRange__(index, low, high))
+            self.__setRange__(combo.currentIndex(), low_spin, high_spin)
+            axes_grid.addWidget(QLabel(title, self), row, 0)
+            axes_grid.addWidget(combo, row, 1)
+            axes_grid.addWidget(QLabel("от", self), row, 2)
+            axes_grid.addWidget(low_spin, row, 3)
+            axes_grid.addWidget(QLabel("до", self), row, 4)
+            axes_grid.addWidget(high_spin, row, 5)
+            axes_grid.addWidget(QLabel("значений", self), row, 6)
+            axes_grid.addWidget(steps_spin, row, 7)
+            self.axis_widgets.append((combo, low_spin, high_spin, steps_spin))
+        #   Кнопка расчета
+        self.compute_button = QPushButton("Рассчитать", self)
+        self.compute_button.clicked.connect(self.compute)
+        axes_grid.addWidget(self.compute_button, 2, 7)
+        #   Лэйбл: статус расчета
+        self.status_label = QLabel(self)
+        axes_grid.addWidget(self.status_label, 2, 0, 1, 7)
+        #   Изображение результатов
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg
+        self.canvas = FigureCanvasQTAgg(Figure(figsize=(10, 5), tight_layout=True))
+
+        vbox = QVBoxLayout()
+        vbox.addLayout(axes_grid)
+        vbox.addWidget(self.canvas, stretch=1)
+        self.setLayout(vbox)
+
+    def __setRange__(self, index, low_spin, high_spin):
+        spin = self.spins[index]
+        for box in (low_spin, high_spin):
+            box.setDecimals(spin.decimals() if isinstance(spin, QDoubleSpinBox) else 0)
+            box.setRange(spin.minimum(), spin.maximum())
+            box.setSingleStep(spin.singleStep())
+        low_spin.setValue(spin.minimum())
+        high_spin.setValue(spin.maximum())
+
+    def compute(self):
+        import numpy as np
+        import SOM
+        from matplotlib.colors import ListedColormap
+
+        (x_combo, x_low, x_high, x_steps), (y_combo, y_low, y_high, y_steps) = self.axis_widgets
+        if x_combo.currentIndex() == y_combo.currentIndex():
+            self.status_label.setText("Выберите разные параметры!")
+            self.status_label.setStyleSheet("color: red")
+            return
+        base = [spin.value() for spin in self.spins]
+        x = np.linspace(x_low.value(), x_high.value(), x_steps.value())
+        y = np.linspace(y_low.value(), y_high.value(), y_steps.value())
+        start = time.perf_counter()
+        velocity, clusters = self.som.sensitivity(base, {x_combo.currentIndex(): x, y_combo.currentIndex(): y})
+        elapsed = time.perf_counter() - start
+
+        figure = self.canvas.figure
+        figure.clear()
+        # Скорость осаждения
+        ax1 = figure.add_subplot(121)
+        mesh = ax1.pcolormesh(x, y, velocity.T, shading='auto', cmap='viridis')
+        figure.colorbar(mesh, ax=ax1, label="Скорость осаждения, мм/с")
+        # Класс качества очистки нейрона-победителя
+        ax2 = figure.add_subplot(122)
+        classes = ListedColormap([SOM.LABEL_COLORS[name] for name in SOM.TARGET_NAMES])
+        mesh = ax2.pcolormesh(x, y, clusters.T, shading='auto', cmap=classes,
+                              vmin=-0.5, vmax=len(SOM.TARGET_NAMES) - 0.5)
+        bar = figure.colorbar(mesh, ax=ax2, ticks=range(len(SOM.TARGET_NAMES)))
+        bar.ax.set_yticklabels([SOM.LABEL_NAMES[name] for name in SOM.TARGET_NAMES])
+        for ax in (ax1, ax2):
+            ax.set_xlabel(x_combo.currentText())
+            ax.set_ylabel(y_combo.currentText())
+        self.canvas.draw_idle()
+        self.status_label.setText(f"Рассчитано {velocity.size} точек за {elapsed:.2f} с")
+        self.status_label.setStyleSheet("color: green")
+
+
 class CentralWidget(QWidget):
     def __init__(self, parent=None):
         QWidget.__init__(self, parent)
         self.fname = None  # Имя файла
+        self.som = None  # Обученная модель
+        self.training_thread = None  # Поток обучения новой модели
+        self.map_canvas = None  # Встроенное изображение карты, создается при первой отрисовке
+        self.profile_file = None  # Файл отчета cProfile (None - без профилирования)
         self.initUI()
 
     def initUI(self):
@@ -54,6 +215,7 @@ class CentralWidget(QWidget):
         self.__configureSpins__()
         self.epochs_label = QLabel("Укажите количество эпох обучения: ", self)
         self.lr_label = QLabel("Выберите коэффициент обучения: ", self)
+        self.engine_label = QLabel("Выберите алгоритм обучения: ", self)
         #   Лэйбл: выбор файла
         self.file_label = QLabel(self)
         self.file_label.setText("Выберите файл с данными: ")
@@ -63,6 +225,14 @@ class CentralWidget(QWidget):
         #   Кнопка начала обучения
         self.start_training_button = QPushButton("Начать обучение", self)
         self.start_training_button.clicked.connect(self.startTraining)
+        #   Индикатор хода обучения
+        self.progress_bar = QProgressBar(self)
+        self.progress_bar.setFormat("%p%")
+        self.progress_bar.hide()
+        #   Кнопка прерывания обучения
+        self.cancel_button = QPushButton("Прервать", self)
+        self.cancel_button.clicked.connect(self.cancelTraining)
+        self.cancel_button.hide()
         #   Чекбокс отрисовки карты
         self.check_plot = QCheckBox("Нарисовать карту", self)
         #   Кнопка отрисовки карты
@@ -71,6 +241,10 @@ class CentralWidget(QWidget):
         self.plot_button.clicked.connect(self.plot_map)
         #   Лэйбл: статус обучения
         self.status_label = QLabel(self)
+        #   Лэйбл: время этапов обработки
+        self.timing_label = QLabel(self)
+        self.timing_label.setWordWrap(True)
+        self.timing_label.setStyleSheet("color: gray")
         #   Кнопка сброса интерфейса
         self.reset_button = QPushButton("Сбросить", self)
         self.reset_button.setDisabled(True)
@@ -86,10 +260,15 @@ class CentralWidget(QWidget):
         settings_grid.addWidget(self.epochs_spin, 1, 2)
         settings_grid.addWidget(self.lr_label, 2, 0, 1, 2, alignment=Qt.AlignLeft)
         settings_grid.addWidget(self.lr_spin, 2, 2)
-        settings_grid.addWidget(self.start_training_button, 3, 2)
-        settings_grid.addWidget(self.check_plot, 3, 0, 1, 2)
-        settings_grid.addWidget(self.status_label, 4, 1, alignment=Qt.AlignCenter)
-        settings_grid.addWidget(self.plot_button, 5, 1)
+        settings_grid.addWidget(self.engine_label, 3, 0, 1, 2, alignment=Qt.AlignLeft)
+        settings_grid.addWidget(self.engine_combo, 3, 2)
+        settings_grid.addWidget(self.start_training_button, 4, 2)
+        settings_grid.addWidget(self.check_plot, 4, 0, 1, 2)
+        settings_grid.addWidget(self.progress_bar, 5, 0, 1, 2)
+        settings_grid.addWidget(self.cancel_button, 5, 2)
+        settings_grid.addWidget(self.status_label, 6, 1, alignment=Qt.AlignCenter)
+        settings_grid.addWidget(self.plot_button, 7, 1)
+        settings_grid.addWidget(self.timing_label, 8, 0, 1, 3)
 
         self.settings_groupbox.setLayout(settings_grid)
 
@@ -104,9 +283,13 @@ class CentralWidget(QWidget):
         #   Кнопка отрисовки карты эксперимента
         self.plot_sample_button = QPushButton("Отрисовать эксперимент на карте", self)
         self.plot_sample_button.clicked.connect(self.plot_prediction)
+        #   Кнопка анализа чувствительности
+        self.sensitivity_button = QPushButton("Анализ чувствительности", self)
+        self.sensitivity_button.clicked.connect(self.sensitivity)
 
         labels = [self.dose_spin_label, self.mass_spin_label, self.l_expenses_label, self.m_expenses_label,
                   self.v_mixing_label, self.t_mixing_label, self.h_layer_label, self.t_layer_label]
+        self.sample_labels = labels
         self.spins = [self.dose_spin, self.mass_spin, self.l_expenses_spin, self.m_expenses_spin, self.v_mixing_spin,
                       self.t_mixing_spin, self.h_layer_spin, self.t_layer_spin]
 
@@ -122,6 +305,7 @@ class CentralWidget(QWidget):
         sample_grid.addWidget(self.predict_label, 2, 0, 1, self.grid_cols, alignment=Qt.AlignCenter)
         sample_grid.addWidget(self.predict_button, 3, 0, 1, self.grid_cols, alignment=Qt.AlignCenter)
         sample_grid.addWidget(self.plot_sample_button, 4, 0, 1, self.grid_cols, alignment=Qt.AlignCenter)
+        sample_grid.addWidget(self.sensitivity_button, 5, 0, 1, self.grid_cols, alignment=Qt.AlignCenter)
         self.sample_groupbox.setLayout(sample_grid)
 
         #  Расположение элементов в сетке
@@ -129,7 +313,10 @@ class CentralWidget(QWidget):
         self.vbox.addWidget(self.settings_groupbox)
         self.vbox.addWidget(self.sample_groupbox)
         self.vbox.addWidget(self.reset_button)
-        self.setLayout(self.vbox)
+        #  Изображение карты располагается справа от настроек
+        self.hbox = QHBoxLayout()
+        self.hbox.addLayout(self.vbox)
+        self.setLayout(self.hbox)
 
     def __configureSampleLabels__(self):
         self.dose_spin_label = QLabel("Д, мл", self)
@@ -196,14 +383,92 @@ class CentralWidget(QWidget):
         self.lr_spin.setRange(0.05, 1)
         self.lr_spin.setValue(0.5)
         self.lr_spin.setSingleStep(0.05)
+        # Выбор алгоритма обучения
+        self.engine_combo = QComboBox(self)
+        self.engine_combo.addItem("Последовательный (MiniSom)", 'minisom')
+        self.engine_combo.addItem("Пакетный", 'batch')
+        self.engine_combo.currentIndexChanged.connect(self.__engineChanged__)
+
+    def __engineChanged__(self):
+        """
+        Функция включения выбора коэффициента обучения только для алгоритма MiniSom
+
+        Пакетный алгоритм пересчитывает веса как взвешенное среднее образцов
+        и не использует коэффициент обучения.
+        """
+        batch = self.engine_combo.currentData() == 'batch'
+        self.lr_spin.setEnabled(not batch)
+        self.lr_spin.setToolTip("Пакетный алгоритм не использует коэффициент обучения" if batch else "")
 
     def open_file_dialog(self):
         import os
-        fname, _ = QFileDialog.getOpenFileName(self, "Выберите файл", '.', "Файлы Exсel (*.xlsx *.xls)")
+        fname, _ = QFileDialog.getOpenFileName(self, "Выберите файл", '.', "Файлы данных (*.xlsx *.xls *.csv)")
         # self.fname = os.path.basename(fname).split('/')[-1]
         self.fname = fname
         print(f"fname = {self.fname}")
 
+    def __isTraining__(self):
+        """
+        Функция проверки, идет ли обучение новой модели
+
+        Пока идет обучение, открытие и сохранение модели недоступны: результат обучения
+        заменит текущую модель после его завершения. Если обучение идет, об этом выводится
+        сообщение.
+
+        :rtype: bool
+        :return: True, если поток обучения запущен
+        """
+        if self.training_thread is not None and self.training_thread.isRunning():
+            self.status_label.setText("Дождитесь окончания обучения!")
+            self.status_label.setStyleSheet("color: red")
+            return True
+        return False
+
+    def open_model_dialog(self):
+        if self.__isTraining__():
+            return
+        fname, _ = QFileDialog.getOpenFileName(self, "Выберите модель", '.', "Модель SOM (*.npz)")
+        if fname == "":
+            return
+        import SOM
+        try:
+            self.som = SOM.SOM.load(fname, mmap_mode='r')
+        except (OSError, ValueError, KeyError, zipfile.BadZipFile) as e:
+            self.status_label.setText("Не удалось открыть модель!")
+            self.status_label.setStyleSheet("color: red")
+            print(f"Model loading error: {e}")
+            return
+        self.browse_file_button.setDisabled(True)
+        self.epochs_spin.setDisabled(True)
+        self.lr_spin.setDisabled(True)
+        self.engine_combo.setDisabled(True)
+        self.start_training_button.setDisabled(True)
+        self.plot_button.setEnabled(True)
+        self.reset_button.setEnabled(True)
+        self.sample_groupbox.setEnabled(True)
+        self.status_label.setText("Модель загружена!")
+        self.status_label.setStyleSheet("color: green")
+
+    def save_model_dialog(self):
+        if self.__isTraining__():
+            return
+        if self.som == None or self.som.winners is None:
+            self.status_label.setText("Сначала обучите сеть!")
+            self.status_label.setStyleSheet("color: red")
+            return
+        fname, _ = QFileDialog.getSaveFileName(self, "Сохранить модель", '.', "Модель SOM (*.npz)")
+        if fname == "":
+            return
+        try:
+            self.som.save(fname)
+        except OSError as e:
+            self.status_label.setText("Не удалось сохранить модель!")
+            self.status_label.setStyleSheet("color: red")
+            print(f"Model saving error: {e}")
+            return
+        self.status_label.setText("Модель сохранена!")
+        self.status_label.setStyleSheet("color: green")
+
     def startTraining(self):
         if self.fname == None or self.fname == "":
             self.status_label.setText("Сначала выберите файл!")
@@ -214,15 +479,71 @@ class CentralWidget(QWidget):
             self.browse_file_button.setDisabled(True)
             self.epochs_spin.setDisabled(True)
             self.lr_spin.setDisabled(True)
-            self.som = SOM.SOM(self.fname, self.epochs_spin.value(), self.lr_spin.value())
-            self.som.learning()
-            if self.check_plot.isChecked():
-                self.plot_map()
-            self.plot_button.setEnabled(True)
-            self.reset_button.setEnabled(True)
-            self.sample_groupbox.setEnabled(True)
-            self.status_label.setText("Обучение завершено!")
-            self.status_label.setStyleSheet("color: green")
+            self.engine_combo.setDisabled(True)
+            self.start_training_button.setDisabled(True)
+            self.reset_button.setDisabled(True)
+            import SOM
+            import Profiling
+            profiler = Profiling.StageProfiler(profile=self.profile_file is not None)
+            # Новая модель заменяет текущую только после успешного завершения обучения,
+            # до этого текущая модель остается доступной для отрисовки и прогноза
+            som = SOM.SOM(self.fname, self.epochs_spin.value(), self.lr_spin.value(),
+                          self.engine_combo.currentData(), profiler=profiler)
+            self.timing_label.clear()
+            self.status_label.setText("Идет обучение...")
+            self.status_label.setStyleSheet("color: black")
+            self.progress_bar.setValue(0)
+            self.progress_bar.show()
+            self.cancel_button.setEnabled(True)
+            self.cancel_button.show()
+            self.training_thread = TrainingThread(som, self)
+            self.training_thread.progress.connect(self.trainingProgress)
+            self.training_thread.finished.connect(self.trainingFinished)
+            self.training_thread.start()
+
+    def trainingProgress(self, iteration, total, error):
+        self.progress_bar.setMaximum(total)
+        self.progress_bar.setValue(iteration)
+        self.progress_bar.setFormat(f"%p% (ошибка квантования: {error:.4f})")
+
+    def cancelTraining(self):
+        if self.training_thread is not None:
+            self.training_thread.som.cancel()
+            self.cancel_button.setDisabled(True)
+
+    def trainingFinished(self):
+        self.progress_bar.hide()
+        self.cancel_button.hide()
+        self.reset_button.setEnabled(True)
+        self.start_training_button.setEnabled(True)
+        if not self.training_thread.completed:
+            self.browse_file_button.setEnabled(True)
+            self.epochs_spin.setEnabled(True)
+            self.engine_combo.setEnabled(True)
+            self.__engineChanged__()
+            if self.training_thread.error is None:
+                self.status_label.setText("Обучение прервано!")
+            else:
+                self.status_label.setText("Ошибка обучения!")
+                print(f"Training error: {self.training_thread.error}")
+            self.status_label.setStyleSheet("color: red")
+            return
+        self.som = self.training_thread.som
+        if self.check_plot.isChecked():
+            self.plot_map()
+        self.plot_button.setEnabled(True)
+        self.sample_groupbox.setEnabled(True)
+        self.status_label.setText("Обучение завершено!")
+        self.status_label.setStyleSheet("color: green")
+        self.showTimings()
+        if self.profile_file is not None:
+            self.som.profiler.to_json(self.profile_file)
+            print(f"Profile written to {self.profile_file}")
+
+    def showTimings(self):
+        totals = self.som.profiler.totals()
+        text = ", ".join(f"{STAGE_NAMES.get(stage, stage)} {seconds:.2f} с" for stage, seconds in totals.items())
+        self.timing_label.setText(f"Время этапов: {text}")
 
     def reset(self):
         self.fname = None
@@ -231,11 +552,15 @@ class CentralWidget(QWidget):
         self.epochs_spin.setEnabled(True)
         self.epochs_spin.setValue(1000)
 
-        self.lr_spin.setEnabled(True)
         self.lr_spin.setValue(0.5)
 
+        self.engine_combo.setEnabled(True)
+        self.__engineChanged__()
+        self.start_training_button.setEnabled(True)
+
         self.status_label.clear()
         self.status_label.setStyleSheet("color: black")
+        self.timing_label.clear()
         self.predict_label.clear()
 
         self.plot_button.setDisabled(True)
@@ -244,9 +569,21 @@ class CentralWidget(QWidget):
 
         self.sample_groupbox.setDisabled(True)
 
+        if self.map_canvas is not None:
+            self.map_canvas.clear_map()
+
+    def __mapCanvas__(self):
+        if self.map_canvas is None:
+            from SomCanvas import MapCanvas
+            self.map_canvas = MapCanvas(self)
+            self.hbox.addWidget(self.map_canvas, stretch=1)
+            self.window().resize(max(self.window().width(), 1600), max(self.window().height(), 700))
+        return self.map_canvas
+
     def plot_map(self):
         if not self.som == None:
-            self.som.plot_som()
+            self.__mapCanvas__().set_map(self.som)
+            self.showTimings()
 
     def __generateSample__(self):
         sample = []
@@ -264,13 +601,41 @@ class CentralWidget(QWidget):
         sample = self.__generateSample__()
         if not self.som == None:
             self.som.regression(sample)
-            self.som.plot_sample()
+            canvas = self.__mapCanvas__()
+            if canvas.som is not self.som:
+                canvas.set_map(self.som)
+            # Перерисовывается только маркер эксперимента
+            canvas.show_sample(*self.som.sample_position(self.som.x_sample))
+
+    def sensitivity(self):
+        if not self.som == None:
+            names = [label.text() for label in self.sample_labels]
+            SensitivityDialog(self.som, names, self.spins, self).exec_()
 
 
-if __name__ == "__main__":
-    import sys
+def report_startup(start):
+    """
+    Функция вывода времени запуска и списка загруженных тяжелых модулей
 
+    :param start: время начала запуска (time.perf_counter)
+    :type start: float
+    """
+    loaded = [name for name in HEAVY_MODULES + ['minisom', 'pandas', 'sklearn', 'matplotlib'] if name in sys.modules]
+    print(f"First paint after {time.perf_counter() - start:.3f} s, heavy modules loaded: {loaded or 'none'}")
+
+
+if __name__ == "__main__":
+    start = time.perf_counter()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(message)s")
     app = QApplication(sys.argv)
     window = MainWindow()
+    if '--profile' in sys.argv:
+        # Профилирование этапов обучения cProfile с сохранением отчета в файл
+        window.central.profile_file = "som_profile.json"
     window.show()
+    if '--quit-after-show' in sys.argv:
+        # Измерение времени запуска (см. SomStartup.py)
+        QTimer.singleShot(0, lambda: (report_startup(start), app.quit()))
+    else:
+        QTimer.singleShot(0, preload_modules)
     sys.exit(app.exec_())
@@ -0,0 +1,310 @@
+import argparse
+import io
+import json
+import os
+import platform
+import tempfile
+import time
+import tracemalloc
+
+import matplotlib
+
+matplotlib.use('Agg')
+
+import numpy as np
+import pandas as pd
+from matplotlib.figure import Figure
+
+import SOM
+import DataLoader
+import Profiling
+from BatchSom import BatchSom
+
+# Столбцы файла FlocculantsData.xlsx
+COLUMNS = ['Д, мл', 'Р, г', 'с,г/л', 'с, г/м3', 'n, об/мин', 't_пер, с', 'h, мм', 't,c', 'v, мм/с',
+           DataLoader.LABEL_COLUMN]
+VELOCITY_CLASSES = [0.595, 0.795, 1.]  # Границы скорости осаждения между классами качества очистки, мм/с
+SLOWER = 1.1  # Отношение времени к предыдущему запуску, начиная с которого этап считается замедлившимся
+
+
+def generate_dataset(rows, seed=0):
+    """
+    Функция генерации синтетического датасета со схемой FlocculantsData.xlsx
+
+    Доза раствора и связанные с ней масса и расходы флокулянта, скорость и время
+    перемешивания, высота слоя принимают значения из диапазонов исходного датасета.
+    Скорость осаждения зависит от дозы и перемешивания с шумом, время осветления
+    согласовано с ней (v = h / t), класс определяется по порогам скорости.
+
+    :param rows: количество образцов
+    :type rows: int
+    :param seed: начальное значение генератора случайных чисел
+    :type seed: int
+
+    :rtype: pandas.DataFrame
+    :return: датасет
+    """
+    rng = np.random.default_rng(seed)
+    dose = rng.integers(0, 14, rows) * 0.5
+    mixing_speed = rng.choice([0, 60, 90, 120, 180], rows)
+    mixing_time = rng.integers(0, 7, rows) * 5
+    height = rng.integers(62, 100, rows)
+    velocity = 0.45 + 0.2 * dose - 0.02 * dose ** 2 + 0.0005 * mixing_speed + 0.002 * mixing_time
+    velocity = np.clip(velocity + rng.normal(0, 0.08, rows), 0.33, 1.53)
+    settling_time = np.round(height / velocity)
+    velocity = height / settling_time
+    labels = np.array(SOM.TARGET_NAMES)[np.searchsorted(VELOCITY_CLASSES, velocity)]
+    return pd.DataFrame(dict(zip(COLUMNS, [dose, dose * 1e-4, dose * 0.002, dose * 2, mixing_speed, mixing_time,
+                                           height, settling_time, velocity, labels])))
+
+
+class StageTimer():
+    """
+    Измерение времени, процессорного времени и пикового объема памяти этапов
+    """
+
+    def __init__(self, rows, grid):
+        self.rows = rows
+        self.grid = grid
+        self.profiler = Profiling.StageProfiler(memory=True)
+        self.accuracy = {}  # Ошибки прогноза скорости осаждения по этапам
+
+    def run(self, stage, function, *args):
+        """
+        Функция выполнения этапа с измерением
+
+        :param stage: название этапа
+        :type stage: str
+        :param function: выполняемая функция
+        :type function: callable
+
+        :return: результат функции
+        """
+        with self.profiler.stage(stage):
+            result = function(*args)
+        record = self.profiler.records[-1]
+        print(f"{self.rows:>8} rows {self.grid:>3}x{self.grid:<3} {stage:<16} {record['seconds']:9.3f} s "
+              f"{record['peak_mb']:9.1f} MB")
+        return result
+
+    def score(self, stage, y_pred, y_true):
+        """
+        Функция записи ошибок прогноза этапа
+
+        :param stage: название этапа
+        :type stage: str
+        :param y_pred: прогноз скорости осаждения
+        :type y_pred: numpy.ndarray
+        :param y_true: фактическая скорость осаждения
+        :type y_true: numpy.ndarray
+        """
+        error = np.asarray(y_pred) - np.asarray(y_true)
+        self.accuracy[stage] = dict(rmse=float(np.sqrt(np.mean(error ** 2))), mae=float(np.mean(np.abs(error))))
+        print(f"{self.rows:>8} rows {self.grid:>3}x{self.grid:<3} {stage:<16} RMSE {self.accuracy[stage]['rmse']:.4f} "
+              f"MAE {self.accuracy[stage]['mae']:.4f}")
+
+    @property
+    def results(self):
+        return [dict(rows=self.rows, grid=self.grid, stage=record['stage'], seconds=record['seconds'],
+                     cpu_seconds=record['cpu_seconds'], peak_mb=record['peak_mb'],
+                     **self.accuracy.get(record['stage'], {}))
+                for record in self.profiler.records]
+
+
+def render(som):
+    """
+    Функция отрисовки карты в растровое изображение без вывода на экран
+
+    :param som: обученная модель
+    :type som: SOM.SOM
+
+    :rtype: int
+    :return: размер изображения, байт
+    """
+    figure = Figure(figsize=(8, 8))
+    som.__drawMap__(figure.add_subplot(111))
+    buffer = io.BytesIO()
+    figure.savefig(buffer, format='png')
+    return buffer.tell()
+
+
+def benchmark(rows, grid, directory, engine='batch', epochs=1000, chunk_size=None, seed=0, index_method='auto',
+              index_dtype=None, compact=False):
+    """
+    Функция измерения этапов работы модели на синтетическом датасете
+
+    Прогноз глобальной и локальными регрессиями нейронов выполняется для отложенной выборки
+    того же размера (начальное значение seed + 1), для него дополнительно записываются
+    RMSE и MAE скорости осаждения.
+
+    Первое чтение файла (ingest) измеряется отдельно, остальные этапы - одним сеансом
+    tracemalloc, поэтому пиковый объем памяти этапа включает данные, сохраненные
+    предыдущими этапами. Итоговая запись 'pipeline' содержит суммарное время и наибольший
+    пиковый объем памяти этих этапов.
+
+    :param rows: количество образцов
+    :type rows: int
+    :param grid: размер стороны карты
+    :type grid: int
+    :param directory: каталог для файла датасета
+    :type directory: str
+    :param engine: алгоритм обучения ('minisom' или 'batch')
+    :type engine: str
+    :param epochs: количество итераций обучения
+    :type epochs: int
+    :param chunk_size: размер блока потоковой обработки (None - весь датасет в памяти)
+    :type chunk_size: int
+    :param seed: начальное значение генератора случайных чисел
+    :type seed: int
+    :param index_method: метод поиска нейронов-победителей ('auto', 'brute' или 'kdtree')
+    :type index_method: str
+    :param index_dtype: тип хранения весов в индексе полного перебора (None - по режиму модели)
+    :type index_dtype: str
+    :param compact: компактный режим модели (данные float32, обработка блоками)
+    :type compact: bool
+
+    :rtype: list
+    :return: результаты измерений этапов
+    """
+    fname = os.path.join(directory, f'synthetic_{rows}.csv')
+    if not os.path.exists(fname):
+        generate_dataset(rows, seed).to_csv(fname, index=False)
+    cache = DataLoader.cache_name(os.path.abspath(fname), np.float32 if compact else np.float64)
+    if os.path.exists(cache):
+        os.remove(cache)
+    timer = StageTimer(rows, grid)
+    som = SOM.SOM(fname, epochs=epochs, engine=engine, chunk_size=chunk_size, grid_size=grid, random_seed=seed,
+                  index_method=index_method, index_dtype=index_dtype, compact=compact)
+    timer.run('ingest', som.data_preprocessing)
+    holdout = generate_dataset(rows, seed + 1)
+    samples = holdout[COLUMNS[:8]].to_numpy(dtype=float)
+    velocity = holdout[COLUMNS[8]].to_numpy()
+    del holdout
+    tracemalloc.start()
+    try:
+        pipeline(timer, som, chunk_size, samples, velocity)
+    finally:
+        tracemalloc.stop()
+    records = [record for record in timer.results if record['stage'] != 'ingest']
+    summary = dict(rows=rows, grid=grid, stage='pipeline',
+                   seconds=sum(record['seconds'] for record in records),
+                   cpu_seconds=sum(record['cpu_seconds'] for record in records),
+                   peak_mb=max(record['peak_mb'] for record in records))
+    print(f"{rows:>8} rows {grid:>3}x{grid:<3} {'pipeline':<16} {summary['seconds']:9.3f} s "
+          f"{summary['peak_mb']:9.1f} MB")
+    return timer.results + [summary]
+
+
+def pipeline(timer, som, chunk_size, samples, velocity):
+    """
+    Функция выполнения этапов после первого чтения файла
+
+    :param timer: измерение этапов
+    :type timer: StageTimer
+    :param som: модель после data_preprocessing
+    :type som: SOM.SOM
+    :param chunk_size: размер блока потоковой обработки
+    :type chunk_size: int
+    :param samples: признаки отложенной выборки
+    :type samples: numpy.ndarray
+    :param velocity: скорость осаждения отложенной выборки
+    :type velocity: numpy.ndarray
+    """
+    if chunk_size is None:
+        timer.run('ingest_cached', som.data_preprocessing)
+
+    def train():
+        som.__createSom__(som.norm_data.shape[1])
+        if isinstance(som.som, BatchSom):
+            som.som.train(som.norm_data, som.epochs, chunk_size=som.__blockRows__(len(som.norm_data)))
+        else:
+            som.som.train(som.norm_data, som.epochs)
+
+    timer.run('train', train)
+    timer.run('map_cache', som.__cacheMap__)
+    timer.run('regression', som.__fitRegression__)
+    timer.run('index', som.__buildIndex__)
+    timer.run('bmu_lookup', som.bmu, som.values)
+    y_pred, _ = timer.run('predict', som.predict_many, samples)
+    timer.score('predict', y_pred, velocity)
+    timer.run('local_regression', som.__fitLocalRegression__)
+    check = som.check_local_regression()
+    if check['max_difference'] > 1e-9:
+        print(f"Local regression of {check['empty_nodes']} empty nodes differs from the global model "
+              f"by {check['max_difference']:.3g}")
+    y_pred, _ = timer.run('predict_local', som.predict_many, samples)
+    timer.score('predict_local', y_pred, velocity)
+    timer.run('render', render, som)
+
+
+def compare(results, previous):
+    """
+    Функция сравнения результатов с предыдущим запуском
+
+    :param results: текущие результаты
+    :type results: list
+    :param previous: результаты предыдущего запуска
+    :type previous: list
+
+    :rtype: int
+    :return: количество замедлившихся этапов
+    """
+    old = {(r['rows'], r['grid'], r['stage']): r for r in previous}
+    slower = 0
+    print(f"{'rows':>8} {'grid':>7} {'stage':<16} {'old, s':>9} {'new, s':>9} {'ratio':>6} {'old MB':>8} {'new MB':>8}")
+    for r in results:
+        o = old.get((r['rows'], r['grid'], r['stage']))
+        if o is None:
+            continue
+        ratio = r['seconds'] / max(o['seconds'], 1e-9)
+        flag = ''
+        if ratio >= SLOWER:
+            flag = ' slower'
+            slower += 1
+        print(f"{r['rows']:>8} {r['grid']:>3}x{r['grid']:<3} {r['stage']:<16} {o['seconds']:9.3f} {r['seconds']:9.3f} "
+              f"{ratio:6.2f} {o['peak_mb']:8.1f} {r['peak_mb']:8.1f}{flag}")
+    return slower
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Измерение производительности этапов работы модели")
+    parser.add_argument('--rows', type=int, nargs='+', default=[100, 1000, 10000],
+                        help="размеры синтетических датасетов (до 1000000)")
+    parser.add_argument('--grid', type=int, nargs='+', default=[10, 30], help="размеры стороны карты (до 100)")
+    parser.add_argument('--engine', choices=list(SOM.SOM.engines), default='batch', help="алгоритм обучения")
+    parser.add_argument('--epochs', type=int, default=1000, help="количество итераций обучения")
+    parser.add_argument('--chunk-size', type=int, default=None, help="размер блока потоковой обработки")
+    parser.add_argument('--seed', type=int, default=0, help="начальное значение генератора")
+    parser.add_argument('--index-method', choices=['auto', 'brute', 'kdtree'], default='auto',
+                        help="метод поиска нейронов-победителей")
+    parser.add_argument('--index-dtype', choices=['float64', 'float32'], default=None,
+                        help="тип весов в индексе полного перебора (по умолчанию float32 в компактном режиме)")
+    parser.add_argument('--compact', action='store_true', help="компактный режим (данные float32)")
+    parser.add_argument('--data-dir', default=None, help="каталог синтетических датасетов (по умолчанию временный)")
+    parser.add_argument('--output', default="benchmark.json", help="файл результатов (json)")
+    parser.add_argument('--compare', default=None, help="файл результатов предыдущего запуска (json)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix='som_bench_') as tmp:
+        directory = args.data_dir or tmp
+        results = []
+        for rows in args.rows:
+            for grid in args.grid:
+                results += benchmark(rows, grid, directory, args.engine, args.epochs, args.chunk_size, args.seed,
+                                     args.index_method, args.index_dtype, args.compact)
+    meta = dict(timestamp=time.strftime('%Y-%m-%dT%H:%M:%S'), python=platform.python_version(),
+                numpy=np.__version__, platform=platform.platform(), processor=platform.processor(),
+                cpu_count=os.cpu_count(), engine=args.engine, epochs=args.epochs, chunk_size=args.chunk_size,
+                seed=args.seed, index_method=args.index_method, index_dtype=args.index_dtype,
+                compact=args.compact)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(dict(meta=meta, results=results), f, indent=2, ensure_ascii=False)
+    print(f"Results written to {args.output}")
+    if args.compare is not None:
+        with open(args.compare, encoding='utf-8') as f:
+            previous = json.load(f)['results']
+        print(f"{compare(results, previous)} stages slower by {SLOWER - 1:.0%} or more")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+import numpy as np
+
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg
+
+
+class MapCanvas(FigureCanvasQTAgg):
+    """
+    Встроенное в окно изображение самоорганизующейся карты
+
+    Слева рисуется карта из шестиугольников U-матрицы с маркерами классов нейронов, справа -
+    распределение образцов по U-матрице с цветовой шкалой (как в SOM.plot_som). Статические
+    слои обеих панелей рисуются один раз и сохраняются в буфер фона при каждой полной
+    перерисовке. Маркер эксперимента является анимированным слоем: при его перемещении фон
+    восстанавливается из буфера и поверх рисуется только маркер (blitting).
+    """
+
+    def __init__(self, parent=None):
+        FigureCanvasQTAgg.__init__(self, Figure(figsize=(12, 6), tight_layout=True))
+        self.setParent(parent)
+        self.ax = None  # Оси карты, на которых рисуется маркер эксперимента
+        self.distribution_ax = None  # Оси распределения образцов по U-матрице
+        self.__createAxes__()
+        self.som = None  # Модель, карта которой нарисована
+        self.background = None  # Буфер статических слоев
+        self.marker = None  # Маркер эксперимента
+        self.mpl_connect('draw_event', self.__onDraw__)
+
+    def set_map(self, som):
+        """
+        Функция отрисовки статических слоев карты
+
+        :param som: обученная модель
+        :type som: SOM.SOM
+        """
+        self.som = som
+        self.background = None
+        self.__createAxes__()
+        self.figure.suptitle("Самоорганизующаяся карта Кохонена", fontsize=14)
+        self.ax.set_axis_on()
+        self.distribution_ax.set_axis_on()
+        with som.profiler.stage('plot'):
+            som.__drawMap__(self.ax, legend_markersize=8, legend_fontsize=8)
+            mesh = som.__drawDistribution__(self.distribution_ax, s=10)
+        self.figure.colorbar(mesh, ax=self.distribution_ax)
+        self.marker, = self.ax.plot([], [],
+                                    marker='o',
+                                    markerfacecolor='black',
+                                    markeredgecolor='black',
+                                    markersize=12,
+                                    linestyle='None',
+                                    animated=True)
+        self.draw_idle()
+
+    def show_sample(self, x, y):
+        """
+        Функция перемещения маркера эксперимента без перерисовки карты
+
+        :param x: координата нейрона-победителя по горизонтали
+        :type x: float
+        :param y: координата нейрона-победителя по вертикали
+        :type y: float
+        """
+        self.marker.set_data([x], [y])
+        if self.background is None:
+            self.draw_idle()
+            return
+        self.restore_region(self.background)
+        self.ax.draw_artist(self.marker)
+        self.blit(self.figure.bbox)
+
+    def clear_map(self):
+        """
+        Функция очистки изображения
+        """
+        self.som = None
+        self.background = None
+        self.marker = None
+        self.__createAxes__()
+        self.draw_idle()
+
+    def __createAxes__(self):
+        """
+        Функция очистки фигуры (вместе с цветовой шкалой) и создания пустых осей обеих панелей
+        """
+        self.figure.clear()
+        self.ax = self.figure.add_subplot(121)
+        self.distribution_ax = self.figure.add_subplot(122)
+        self.ax.set_axis_off()
+        self.distribution_ax.set_axis_off()
+
+    def __onDraw__(self, event):
+        """
+        Функция сохранения статических слоев после полной перерисовки (в том числе при
+        изменении размера окна) и отрисовки поверх них маркера эксперимента
+        """
+        self.background = self.copy_from_bbox(self.figure.bbox)
+        if self.marker is not None and np.size(self.marker.get_xdata()) > 0:
+            self.ax.draw_artist(self.marker)
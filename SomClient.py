@@ -0,0 +1,122 @@
+import argparse
+import json
+import threading
+import time
+import urllib.request
+
+import numpy as np
+
+DEFAULT_URL = 'http://127.0.0.1:8765'
+
+
+def request(url, path, payload=None, timeout=30.):
+    """
+    Функция отправки запроса серверу прогнозов
+
+    :param url: адрес сервера
+    :type url: str
+    :param path: путь запроса ('/predict', '/stats', '/reload')
+    :type path: str
+    :param payload: тело запроса (None - запрос GET)
+    :type payload: dict
+    :param timeout: время ожидания ответа, с
+    :type timeout: float
+
+    :rtype: dict
+    :return: ответ сервера
+    """
+    data = None if payload is None else json.dumps(payload).encode('utf-8')
+    req = urllib.request.Request(url + path, data=data, headers={'Content-Type': 'application/json'})
+    with urllib.request.urlopen(req, timeout=timeout) as response:
+        return json.loads(response.read())
+
+
+def predict(samples, url=DEFAULT_URL):
+    """
+    Функция прогноза скорости осаждения и класса качества очистки
+
+    :param samples: эксперименты формы (эксперименты, признаки)
+    :type samples: list
+
+    :rtype: dict
+    :return: скорости осаждения, классы качества очистки и координаты нейронов-победителей
+    """
+    return request(url, '/predict', dict(samples=np.asarray(samples, dtype=float).tolist()))
+
+
+def load_test(url=DEFAULT_URL, clients=8, requests=200, rows=1, seed=0):
+    """
+    Функция нагрузочного тестирования сервера прогнозов
+
+    Несколько потоков одновременно отправляют запросы со случайными экспериментами
+    в диапазоне признаков типичного датасета.
+
+    :param url: адрес сервера
+    :type url: str
+    :param clients: количество одновременных клиентов
+    :type clients: int
+    :param requests: количество запросов каждого клиента
+    :type requests: int
+    :param rows: количество экспериментов в запросе
+    :type rows: int
+    :param seed: начальное значение генератора случайных чисел
+    :type seed: int
+
+    :rtype: dict
+    :return: пропускная способность и процентили задержки на стороне клиента, мс
+    """
+    low = np.array([0., 0., 0., 0., 0., 0., 50., 50.])
+    high = np.array([10., 0.001, 0.03, 15., 200., 30., 100., 250.])
+    latencies = [[] for _ in range(clients)]
+    errors = [0] * clients
+
+    def worker(k):
+        rng = np.random.default_rng(seed + k)
+        for _ in range(requests):
+            samples = rng.uniform(low, high, (rows, len(low)))
+            start = time.perf_counter()
+            try:
+                predict(samples, url)
+            except OSError:
+                errors[k] += 1
+                continue
+            latencies[k].append(time.perf_counter() - start)
+
+    threads = [threading.Thread(target=worker, args=(k,)) for k in range(clients)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    latencies = np.concatenate([np.array(latency) for latency in latencies]) * 1000
+    done = len(latencies)
+    result = dict(requests=done, errors=sum(errors), seconds=elapsed,
+                  requests_per_second=done / elapsed, rows_per_second=done * rows / elapsed)
+    for q in (50, 90, 99):
+        result[f'latency_p{q}_ms'] = float(np.percentile(latencies, q)) if done else 0.
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Клиент и нагрузочный тест сервера прогнозов")
+    parser.add_argument('--url', default=DEFAULT_URL, help="адрес сервера")
+    parser.add_argument('--sample', type=float, nargs='+', default=None,
+                        help="признаки одного эксперимента (без нагрузочного теста)")
+    parser.add_argument('--clients', type=int, default=8, help="количество одновременных клиентов")
+    parser.add_argument('--requests', type=int, default=200, help="количество запросов каждого клиента")
+    parser.add_argument('--rows', type=int, default=1, help="количество экспериментов в запросе")
+    parser.add_argument('--reload', default=None, help="заменить модель сервера файлом (.npz)")
+    args = parser.parse_args()
+
+    if args.reload is not None:
+        print(request(args.url, '/reload', dict(model=args.reload)))
+    elif args.sample is not None:
+        print(predict([args.sample], args.url))
+    else:
+        print(json.dumps(load_test(args.url, args.clients, args.requests, args.rows), indent=2))
+        print(json.dumps(request(args.url, '/stats'), indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
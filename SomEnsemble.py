@@ -0,0 +1,171 @@
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+from scipy.optimize import linear_sum_assignment
+
+import SOM
+import SomSweep
+from BatchSom import find_bmu, quantization_error
+
+ALIGN_MAX_NODES = 2500  # Наибольшее количество нейронов, для которого карты совмещаются венгерским алгоритмом
+
+
+def _train_member(config):
+    """
+    Функция обучения одной карты ансамбля в процессе-исполнителе
+
+    :param config: конфигурация карты (см. SomSweep.train_map)
+    :type config: dict
+
+    :rtype: tuple
+    :return: веса карты, ошибка квантования и плоские индексы победителей всех образцов
+    """
+    data = SomSweep.shared_data()
+    som = SomSweep.train_map(config, data)
+    weights = som.som.get_weights()
+    step = config['chunk_size'] or len(data)
+    winners = np.concatenate([find_bmu(weights, data[start:start + step]) for start in range(0, len(data), step)])
+    return weights, quantization_error(weights, data, config['chunk_size']), winners.astype(np.int32)
+
+
+def align(reference, weights):
+    """
+    Функция совмещения нейронов карты с нейронами опорной карты
+
+    Карты, обученные с разными начальными значениями, могут быть повернуты или отражены
+    относительно друг друга. Нейроны сопоставляются взаимно однозначно венгерским алгоритмом
+    (scipy.optimize.linear_sum_assignment) по квадратам расстояний между весами. Для карт
+    больше ALIGN_MAX_NODES нейронов каждому нейрону сопоставляется ближайший нейрон опорной карты.
+
+    :param reference: веса опорной карты
+    :type reference: numpy.ndarray
+    :param weights: веса совмещаемой карты
+    :type weights: numpy.ndarray
+
+    :rtype: numpy.ndarray
+    :return: индексы нейронов опорной карты для каждого нейрона совмещаемой карты
+    """
+    reference = reference.reshape(-1, reference.shape[-1])
+    weights = weights.reshape(-1, weights.shape[-1])
+    if len(weights) > ALIGN_MAX_NODES:
+        return find_bmu(reference, weights)
+    cost = np.einsum('ij,ij->i', weights, weights)[:, np.newaxis] - 2 * weights @ reference.T \
+        + np.einsum('ij,ij->i', reference, reference)
+    rows, columns = linear_sum_assignment(cost)
+    mapping = np.empty(len(weights), dtype=np.intp)
+    mapping[rows] = columns
+    return mapping
+
+
+def ensemble(som, seeds, workers=None):
+    """
+    Функция обучения ансамбля карт с разными начальными значениями генератора
+
+    Карты обучаются параллельно в пуле процессов на общих нормализованных данных
+    (SomSweep.shared_pool) и совмещаются с опорной картой - картой с наименьшей ошибкой
+    квантования. Класс нейрона опорной карты определяется голосованием образцов всех
+    карт, попавших в совмещенные с ним нейроны. Для каждого образца вычисляется доля карт,
+    в которых его нейрон-победитель имеет наиболее частый для образца класс.
+
+    Модель som получает веса опорной карты и согласованные классы нейронов (node_classes).
+
+    :param som: модель с загруженными данными (после data_preprocessing)
+    :type som: SOM.SOM
+    :param seeds: начальные значения генератора случайных чисел
+    :type seeds: list
+    :param workers: количество процессов (None - по числу ядер)
+    :type workers: int
+
+    :rtype: dict
+    :return: ошибки квантования карт, индекс опорной карты, согласие карт по классам нейронов
+        (строки, столбцы; NaN для нейронов без образцов), классы образцов и их устойчивость (доля карт)
+    """
+    configs = [dict(sigma=som.sigma, learning_rate=som.learning_rate, grid_size=som.grid_rows, seed=seed,
+                    epochs=som.epochs, engine=som.engine, chunk_size=som.chunk_size)
+               for seed in seeds]
+    with SomSweep.shared_pool(som.norm_data, workers) as pool:
+        members = list(pool.map(_train_member, configs))
+    errors = np.array([error for _, error, _ in members])
+    reference = int(np.argmin(errors))
+    reference_weights = members[reference][0]
+    nodes = som.grid_rows * som.grid_columns
+    classes = len(SOM.TARGET_NAMES)
+    codes = np.asarray(som.target.codes)
+    labelled = codes >= 0
+
+    # Голоса образцов за классы нейронов опорной карты
+    mappings = [align(reference_weights, weights) for weights, _, _ in members]
+    votes = np.zeros((nodes, classes), dtype=np.int64)
+    member_classes = []
+    for (weights, _, winners), mapping in zip(members, mappings):
+        counts = np.bincount(winners[labelled] * classes + codes[labelled],
+                             minlength=nodes * classes).reshape(nodes, classes)
+        np.add.at(votes, mapping, counts)
+        member_classes.append((mapping, np.where(counts.sum(axis=1) > 0, np.argmax(counts, axis=1), -1)))
+    consensus = np.argmax(votes, axis=1).astype(np.int8)
+    empty = votes.sum(axis=1) == 0
+    if empty.any() and not empty.all():
+        codebook = reference_weights.reshape(nodes, -1)
+        consensus[empty] = consensus[~empty][find_bmu(codebook[~empty], codebook[empty])]
+    # Доля карт, в которых класс совмещенного нейрона совпадает с согласованным
+    agreement = np.zeros(nodes)
+    voters = np.zeros(nodes)
+    for mapping, node_class in member_classes:
+        has_class = node_class >= 0
+        np.add.at(agreement, mapping[has_class], node_class[has_class] == consensus[mapping[has_class]])
+        np.add.at(voters, mapping[has_class], 1)
+    agreement = np.divide(agreement, voters, out=np.full(nodes, np.nan), where=voters > 0)
+
+    # Классы образцов по каждой карте и их устойчивость
+    sample_votes = np.zeros((len(codes), classes), dtype=np.int32)
+    for (_, _, winners), mapping in zip(members, mappings):
+        sample_votes[np.arange(len(codes)), consensus[mapping[winners]]] += 1
+
+    som.__createSom__(reference_weights.shape[2])
+    som.som._weights = reference_weights
+    som.__cacheMap__()
+    som.node_labels = consensus.reshape(som.grid_rows, som.grid_columns)
+    return dict(seeds=list(seeds), quantization_errors=errors, reference=reference,
+                node_agreement=agreement.reshape(som.grid_rows, som.grid_columns),
+                sample_classes=np.argmax(sample_votes, axis=1).astype(np.int8),
+                stability=sample_votes.max(axis=1) / len(members))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ансамбль самоорганизующихся карт с разными начальными значениями")
+    parser.add_argument('--data', default="FlocculantsData.xlsx", help="файл с данными (xlsx или csv)")
+    parser.add_argument('--maps', type=int, default=8, help="количество карт ансамбля")
+    parser.add_argument('--epochs', type=int, default=1000, help="количество эпох обучения")
+    parser.add_argument('--engine', choices=list(SOM.SOM.engines), default='minisom', help="алгоритм обучения")
+    parser.add_argument('--grid', type=int, default=None, help="размер стороны карты")
+    parser.add_argument('--chunk-size', type=int, default=None, help="размер блока потоковой обработки")
+    parser.add_argument('--workers', type=int, default=None, help="количество процессов")
+    parser.add_argument('--output', default="ensemble.csv", help="файл классов и устойчивости образцов")
+    parser.add_argument('--save', default=None, help="сохранить опорную карту с согласованными классами (.npz)")
+    args = parser.parse_args()
+
+    som = SOM.SOM(args.data, epochs=args.epochs, engine=args.engine, chunk_size=args.chunk_size,
+                  grid_size=args.grid)
+    som.data_preprocessing()
+    start = time.perf_counter()
+    result = ensemble(som, range(args.maps), args.workers)
+    elapsed = time.perf_counter() - start
+    table = pd.DataFrame({'label': np.asarray(som.target),
+                          'consensus': pd.Categorical.from_codes(result['sample_classes'], SOM.TARGET_NAMES),
+                          'stability': result['stability'],
+                          'bmu_row': som.winners[:, 0],
+                          'bmu_column': som.winners[:, 1]})
+    table.to_csv(args.output, index=False)
+    print(f"{args.maps} maps trained in {elapsed:.2f} s, reference map seed {result['seeds'][result['reference']]}")
+    print(f"Quantization errors: {np.round(result['quantization_errors'], 4)}")
+    print(f"Mean node agreement {np.nanmean(result['node_agreement']):.3f}, "
+          f"mean sample stability {result['stability'].mean():.3f}, "
+          f"samples with stability 1: {np.mean(result['stability'] == 1):.1%}")
+    if args.save is not None:
+        som.save(args.save)
+
+
+if __name__ == "__main__":
+    main()
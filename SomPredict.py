@@ -0,0 +1,105 @@
+import argparse
+import time
+
+import pandas as pd
+
+import SOM
+import DataLoader
+
+CLUSTER_COLUMN = 'Cluster'  # Столбец класса качества очистки в файле прогноза
+BMU_COLUMNS = ['BMU_row', 'BMU_column']  # Столбцы координат нейрона-победителя
+
+
+def select_features(som, values, columns):
+    """
+    Функция выбора столбцов признаков модели из блока входного файла
+
+    Если во входном файле есть все признаки модели, они выбираются по названиям
+    (лишние столбцы, например скорость осаждения, игнорируются), иначе - первые
+    столбцы по порядку.
+
+    :param som: обученная модель
+    :type som: SOM.SOM
+    :param values: блок входного файла
+    :type values: numpy.ndarray
+    :param columns: названия столбцов блока
+    :type columns: list
+
+    :rtype: tuple
+    :return: матрица признаков формы (эксперименты, признаки) и названия признаков
+    """
+    n_features = som.som.get_weights().shape[2] - 1
+    features = som.columns[:-1] if som.columns is not None else None
+    if features is not None and all(feature in columns for feature in features):
+        return values[:, [columns.index(feature) for feature in features]], features
+    if values.shape[1] < n_features:
+        raise ValueError(f"Input has {values.shape[1]} columns, the model expects {n_features} features")
+    return values[:, :n_features], columns[:n_features]
+
+
+def predict_file(som, input_name, output_name, chunk_size=100000):
+    """
+    Функция потокового прогноза для файла планируемых экспериментов
+
+    Файл читается блоками по chunk_size строк, для каждого блока одним векторизованным
+    вызовом вычисляются скорость осаждения, нейрон-победитель и класс качества очистки
+    нейрона. Результаты дописываются в выходной файл CSV.
+
+    :param som: обученная модель
+    :type som: SOM.SOM
+    :param input_name: входной файл (xlsx или csv)
+    :type input_name: str
+    :param output_name: выходной файл csv
+    :type output_name: str
+    :param chunk_size: количество строк в блоке
+    :type chunk_size: int
+
+    :rtype: int
+    :return: количество обработанных экспериментов
+    """
+    classes = som.node_classes()
+    target = som.columns[-1] if som.columns is not None else 'v'
+    total = 0
+    with open(output_name, 'w', newline='', encoding='utf-8') as f:
+        for values, columns, _ in DataLoader.iter_chunks(input_name, chunk_size):
+            samples, features = select_features(som, values, columns)
+            velocity, bmu = som.predict_many(samples)
+            result = pd.DataFrame(samples, columns=features)
+            result[target] = velocity
+            result[CLUSTER_COLUMN] = pd.Categorical.from_codes(classes[bmu[:, 0], bmu[:, 1]],
+                                                               categories=SOM.TARGET_NAMES)
+            result[BMU_COLUMNS[0]] = bmu[:, 0]
+            result[BMU_COLUMNS[1]] = bmu[:, 1]
+            result.to_csv(f, header=total == 0, index=False)
+            total += len(result)
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Пакетный прогноз скорости осаждения и класса качества очистки")
+    parser.add_argument('input', help="файл планируемых экспериментов (xlsx или csv)")
+    parser.add_argument('--output', default="predictions.csv", help="файл результатов (csv)")
+    parser.add_argument('--model', default=None, help="файл обученной модели (.npz)")
+    parser.add_argument('--data', default="FlocculantsData.xlsx",
+                        help="файл с данными для обучения, если модель не задана")
+    parser.add_argument('--epochs', type=int, default=1000, help="количество эпох обучения")
+    parser.add_argument('--engine', choices=list(SOM.SOM.engines), default='minisom', help="алгоритм обучения")
+    parser.add_argument('--save', default=None, help="сохранить обученную модель в файл (.npz)")
+    parser.add_argument('--chunk-size', type=int, default=100000, help="количество строк в блоке")
+    args = parser.parse_args()
+
+    if args.model is not None:
+        som = SOM.SOM.load(args.model, mmap_mode='r')
+    else:
+        som = SOM.SOM(args.data, epochs=args.epochs, engine=args.engine)
+        som.learning()
+        if args.save is not None:
+            som.save(args.save)
+    start = time.perf_counter()
+    total = predict_file(som, args.input, args.output, args.chunk_size)
+    elapsed = time.perf_counter() - start
+    print(f"{total} experiments predicted in {elapsed:.2f} s ({total / max(elapsed, 1e-9) * 60:.0f} rows/min)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,272 @@
+import argparse
+import collections
+import json
+import queue
+import threading
+import time
+import zipfile
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+import SOM
+
+LATENCY_WINDOW = 10000  # Количество последних запросов для расчета процентилей задержки
+
+
+class PendingRequest():
+    """
+    Запрос на прогноз, ожидающий обработки в составе пакета
+    """
+
+    def __init__(self, samples):
+        self.samples = samples
+        self.result = None
+        self.error = None
+        self.received = time.perf_counter()
+        self.done = threading.Event()
+
+
+class Predictor():
+    """
+    Резидентная модель с объединением одновременных запросов в пакеты
+
+    Запросы из потоков HTTP-сервера помещаются в очередь. Поток обработки забирает
+    все накопившиеся запросы (не больше max_batch экспериментов, ожидая новые не дольше
+    max_delay секунд), вычисляет прогноз одним векторизованным вызовом predict_many
+    и раздает результаты. Модель заменяется между пакетами, поэтому запросы при замене
+    не теряются.
+    """
+
+    def __init__(self, som, max_batch=4096, max_delay=0.002):
+        """
+        Конструктор класса Predictor
+        :param som: обученная модель
+        :type som: SOM.SOM
+        :param max_batch: максимальное количество экспериментов в пакете
+        :type max_batch: int
+        :param max_delay: максимальное время ожидания запросов для пакета, с
+        :type max_delay: float
+        """
+        som.node_classes()
+        self.som = som
+        self.model_name = som.fname
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.queue = queue.Queue()
+        self.lock = threading.Lock()
+        # Счетчики
+        self.started = time.time()
+        self.requests = 0
+        self.rows = 0
+        self.batches = 0
+        self.errors = 0
+        self.reloads = 0
+        self.latencies = collections.deque(maxlen=LATENCY_WINDOW)
+        self.thread = threading.Thread(target=self.__run__, daemon=True)
+        self.thread.start()
+
+    def predict(self, samples, timeout=None):
+        """
+        Функция прогноза для экспериментов одного запроса
+
+        :param samples: эксперименты формы (эксперименты, признаки)
+        :type samples: numpy.ndarray
+        :param timeout: максимальное время ожидания результата, с
+        :type timeout: float
+
+        :rtype: dict
+        :return: скорости осаждения, классы качества очистки и координаты нейронов-победителей
+        """
+        request = PendingRequest(samples)
+        self.queue.put(request)
+        if not request.done.wait(timeout):
+            raise TimeoutError("Prediction timed out")
+        if request.error is not None:
+            raise request.error
+        return request.result
+
+    def reload(self, fname=None):
+        """
+        Функция замены модели новой, сохраненной в файл
+
+        Модель загружается в вызывающем потоке, поток обработки продолжает обслуживать
+        запросы старой моделью и переключается на новую перед следующим пакетом.
+        Модель читается в память целиком (без отображения файла), поэтому файл можно
+        перезаписать любым способом, не затрагивая резидентную модель.
+
+        :param fname: имя файла модели (None - повторная загрузка текущего файла)
+        :type fname: str
+        """
+        fname = fname or self.model_name
+        som = SOM.SOM.load(fname)
+        som.node_classes()
+        with self.lock:
+            self.som = som
+            self.model_name = fname
+            self.reloads += 1
+
+    def stats(self):
+        """
+        Функция получения счетчиков производительности
+
+        :rtype: dict
+        :return: количество запросов, экспериментов и пакетов, пропускная способность
+            и процентили задержки, мс
+        """
+        with self.lock:
+            latencies = np.array(self.latencies) * 1000
+            uptime = time.time() - self.started
+            stats = dict(model=self.model_name, uptime=uptime, requests=self.requests, rows=self.rows,
+                         batches=self.batches, errors=self.errors, reloads=self.reloads,
+                         queued=self.queue.qsize(),
+                         mean_batch_rows=self.rows / self.batches if self.batches else 0.,
+                         requests_per_second=self.requests / uptime,
+                         rows_per_second=self.rows / uptime)
+        for q in (50, 90, 99):
+            stats[f'latency_p{q}_ms'] = float(np.percentile(latencies, q)) if len(latencies) else 0.
+        return stats
+
+    def __run__(self):
+        """
+        Функция потока обработки пакетов запросов
+        """
+        while True:
+            batch = [self.queue.get()]
+            size = len(batch[0].samples)
+            deadline = time.perf_counter() + self.max_delay
+            while size < self.max_batch:
+                try:
+                    request = self.queue.get(timeout=max(0., deadline - time.perf_counter()))
+                except queue.Empty:
+                    break
+                batch.append(request)
+                size += len(request.samples)
+            self.__process__(batch)
+
+    def __process__(self, batch):
+        """
+        Функция вычисления прогноза для пакета запросов
+
+        :param batch: запросы
+        :type batch: list
+        """
+        with self.lock:
+            som = self.som
+        try:
+            velocity, bmu = som.predict_many(np.vstack([request.samples for request in batch]))
+            classes = som.node_classes()[bmu[:, 0], bmu[:, 1]]
+        except Exception as e:
+            for request in batch:
+                request.error = e
+                request.done.set()
+            with self.lock:
+                self.errors += len(batch)
+            return
+        start = 0
+        finished = time.perf_counter()
+        for request in batch:
+            end = start + len(request.samples)
+            request.result = dict(velocity=velocity[start:end].tolist(),
+                                  cluster=[SOM.TARGET_NAMES[code] for code in classes[start:end]],
+                                  bmu=bmu[start:end].tolist())
+            request.done.set()
+            start = end
+        with self.lock:
+            self.requests += len(batch)
+            self.rows += start
+            self.batches += 1
+            self.latencies.extend(finished - request.received for request in batch)
+
+
+class PredictionHandler(BaseHTTPRequestHandler):
+    """
+    Обработчик HTTP-запросов сервера прогнозов
+
+    POST /predict  {"samples": [[...], ...]} - прогноз для экспериментов
+    GET  /stats                              - счетчики производительности
+    POST /reload   {"model": "file.npz"}     - замена модели
+    """
+    predictor = None
+    timeout_seconds = 30.
+
+    def do_GET(self):
+        if self.path == '/stats':
+            self.__reply__(200, self.predictor.stats())
+        else:
+            self.__reply__(404, dict(error=f"Unknown path {self.path}"))
+
+    def do_POST(self):
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            body = json.loads(self.rfile.read(length) or b'{}')
+            if self.path == '/predict':
+                n_features = self.predictor.som.som.get_weights().shape[2] - 1
+                samples = np.asarray(body['samples'], dtype=float).reshape(-1, n_features)
+                if not np.all(np.isfinite(samples)):
+                    raise ValueError("Samples must be finite numbers")
+                self.__reply__(200, self.predictor.predict(samples, self.timeout_seconds))
+            elif self.path == '/reload':
+                self.predictor.reload(body.get('model'))
+                self.__reply__(200, dict(model=self.predictor.model_name))
+            else:
+                self.__reply__(404, dict(error=f"Unknown path {self.path}"))
+        except (KeyError, TypeError, AttributeError, ValueError, OSError, zipfile.BadZipFile) as e:
+            self.__reply__(400, dict(error=str(e)))
+        except TimeoutError as e:
+            self.__reply__(503, dict(error=str(e)))
+
+    def __reply__(self, code, payload):
+        data = json.dumps(payload, ensure_ascii=False, allow_nan=False).encode('utf-8')
+        self.send_response(code)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(predictor, host='127.0.0.1', port=8765):
+    """
+    Функция создания HTTP-сервера прогнозов
+
+    :param predictor: резидентная модель
+    :type predictor: Predictor
+    :param host: адрес
+    :type host: str
+    :param port: порт
+    :type port: int
+
+    :rtype: http.server.ThreadingHTTPServer
+    :return: сервер (запускается вызовом serve_forever)
+    """
+    handler = type('Handler', (PredictionHandler,), dict(predictor=predictor))
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Локальный сервер прогнозов самоорганизующейся карты")
+    parser.add_argument('model', help="файл обученной модели (.npz)")
+    parser.add_argument('--host', default='127.0.0.1', help="адрес")
+    parser.add_argument('--port', type=int, default=8765, help="порт")
+    parser.add_argument('--max-batch', type=int, default=4096, help="максимальное количество экспериментов в пакете")
+    parser.add_argument('--max-delay', type=float, default=2., help="время ожидания запросов для пакета, мс")
+    args = parser.parse_args()
+
+    predictor = Predictor(SOM.SOM.load(args.model), args.max_batch, args.max_delay / 1000)
+    server = serve(predictor, args.host, args.port)
+    print(f"Serving predictions on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+APP = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'SomApp.py')
+
+
+def measure(command, repeat=5):
+    """
+    Функция измерения времени выполнения команды в новом процессе
+
+    :param command: команда
+    :type command: list
+    :param repeat: количество повторов
+    :type repeat: int
+
+    :rtype: tuple
+    :return: медианное время, с, и вывод последнего запуска
+    """
+    times = []
+    output = ''
+    for _ in range(repeat):
+        start = time.perf_counter()
+        output = subprocess.run(command, check=True, capture_output=True, text=True,
+                                cwd=os.path.dirname(APP)).stdout.strip()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times), output
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Измерение времени холодного запуска SomApp")
+    parser.add_argument('--repeat', type=int, default=5, help="количество повторов")
+    args = parser.parse_args()
+
+    app_time, app_output = measure([sys.executable, APP, '--quit-after-show'], args.repeat)
+    heavy_time, _ = measure([sys.executable, '-c', 'import SOM, matplotlib.pyplot'], args.repeat)
+    qt_time, _ = measure([sys.executable, '-c', 'import PyQt5.QtWidgets'], args.repeat)
+    print(app_output)
+    print(f"SomApp start to first paint (whole process): {app_time:.3f} s")
+    print(f"Import PyQt5 only:                          {qt_time:.3f} s")
+    print(f"Import SOM and matplotlib (deferred):       {heavy_time:.3f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+import os
+import struct
+import tempfile
+import zipfile
+
+import numpy as np
+
+FORMAT_VERSION = 1  # Версия формата файла обученной модели
+SUFFIX = '.npz'  # Расширение файла архива
+
+
+def archive_name(fname):
+    """
+    Функция получения имени файла архива с расширением .npz
+
+    numpy.savez добавляет расширение .npz к имени без него, поэтому сохранение
+    и чтение используют одно и то же имя.
+
+    :param fname: имя файла
+    :type fname: str
+
+    :rtype: str
+    :return: имя файла с расширением .npz
+    """
+    fname = os.fspath(fname)
+    return fname if fname.endswith(SUFFIX) else fname + SUFFIX
+
+
+def save_arrays(fname, version=FORMAT_VERSION, **arrays):
+    """
+    Функция сохранения массивов в несжатый архив .npz
+
+    Массивы хранятся без сжатия, поэтому при чтении их можно отобразить в память.
+    Архив записывается во временный файл в том же каталоге и атомарно заменяет
+    прежний файл (os.replace): модели, отображающие прежний файл в память, продолжают
+    читать его старое содержимое, а прерванная запись не портит файл.
+
+    :param fname: имя файла (расширение .npz добавляется, если его нет)
+    :type fname: str
+    :param version: версия формата файла
+    :type version: int
+    :param arrays: сохраняемые массивы
+
+    :rtype: str
+    :return: имя записанного файла
+    """
+    fname = archive_name(fname)
+    directory = os.path.dirname(os.path.abspath(fname))
+    fd, tmp_name = tempfile.mkstemp(prefix='.' + os.path.basename(fname) + '.', suffix='.tmp', dir=directory)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            np.savez(f, format_version=version, **arrays)
+        if os.path.exists(fname):
+            os.chmod(tmp_name, os.stat(fname).st_mode & 0o777)
+        else:
+            umask = os.umask(0)
+            os.umask(umask)
+            os.chmod(tmp_name, 0o666 & ~umask)
+        os.replace(tmp_name, fname)
+    except BaseException:
+        if os.path.exists(tmp_name):
+            os.remove(tmp_name)
+        raise
+    return fname
+
+
+def load_arrays(fname, mmap_mode=None, version=FORMAT_VERSION):
+    """
+    Функция чтения массивов из архива .npz
+
+    :param fname: имя файла (расширение .npz добавляется, если его нет)
+    :type fname: str
+    :param mmap_mode: режим отображения массивов в память ('r', 'r+', 'c') или None
+    :type mmap_mode: str
+    :param version: ожидаемая версия формата файла
+    :type version: int
+
+    :rtype: dict
+    :return: словарь массивов
+    """
+    fname = archive_name(fname)
+    offsets = _member_offsets(fname) if mmap_mode is not None else {}
+    arrays = {}
+    with np.load(fname, allow_pickle=False) as archive:
+        for name in archive.files:
+            dtype, shape, order, offset = offsets.get(name, (None, (), 'C', 0))
+            if len(shape) > 0 and np.prod(shape) > 0:
+                arrays[name] = np.memmap(fname, dtype=dtype, mode=mmap_mode, shape=shape, order=order,
+                                         offset=offset)
+            else:
+                arrays[name] = archive[name]
+    file_version = int(arrays.pop('format_version', -1))
+    if file_version != version:
+        raise ValueError(f"Unsupported file version {file_version} in '{fname}', expected {version}")
+    return arrays
+
+
+def _member_offsets(fname):
+    """
+    Функция поиска смещений данных несжатых массивов внутри архива .npz
+
+    :param fname: имя файла
+    :type fname: str
+
+    :rtype: dict
+    :return: словарь {имя: (dtype, shape, order, смещение)}
+    """
+    offsets = {}
+    with zipfile.ZipFile(fname) as archive, open(fname, 'rb') as f:
+        for info in archive.infolist():
+            if info.compress_type != zipfile.ZIP_STORED or not info.filename.endswith('.npy'):
+                continue
+            # Локальный заголовок zip: 30 байт, затем имя файла и дополнительное поле
+            f.seek(info.header_offset)
+            name_len, extra_len = struct.unpack('<HH', f.read(30)[26:30])
+            f.seek(info.header_offset + 30 + name_len + extra_len)
+            version = np.lib.format.read_magic(f)
+            if version == (1, 0):
+                shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+            else:
+                shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(f)
+            if dtype.hasobject:
+                continue
+            offsets[info.filename[:-4]] = (dtype, shape, 'F' if fortran_order else 'C', f.tell())
+    return offsets
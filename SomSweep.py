@@ -0,0 +1,196 @@
+import argparse
+import itertools
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+import SOM
+from BatchSom import BatchSom, quantization_error, topographic_error
+
+# Нормализованные данные, подключенные в процессе-исполнителе
+_shared = {}
+
+
+def _attach(source, shape, dtype):
+    """
+    Функция подключения процесса-исполнителя к общим нормализованным данным
+
+    :param source: имя блока общей памяти или имя файла .npy, отображаемого в память
+    :type source: str
+    :param shape: форма матрицы данных
+    :type shape: tuple
+    :param dtype: тип данных
+    :type dtype: str
+    """
+    if source.endswith('.npy'):
+        _shared['data'] = np.load(source, mmap_mode='r')
+    else:
+        _shared['memory'] = shared_memory.SharedMemory(name=source)
+        _shared['data'] = np.ndarray(shape, dtype=dtype, buffer=_shared['memory'].buf)
+
+
+def shared_data():
+    """
+    Функция получения общих нормализованных данных в процессе-исполнителе
+
+    :rtype: numpy.ndarray
+    :return: нормализованные данные
+    """
+    return _shared['data']
+
+
+@contextmanager
+def shared_pool(norm_data, workers=None):
+    """
+    Контекстный менеджер пула процессов с общими нормализованными данными
+
+    Данные передаются процессам через общую память (или, для данных потоковой обработки,
+    через отображаемый в память файл .npy) без копирования, в процессе-исполнителе они
+    доступны через shared_data().
+
+    :param norm_data: нормализованные данные
+    :type norm_data: numpy.ndarray
+    :param workers: количество процессов (None - по числу ядер)
+    :type workers: int
+    """
+    memory = None
+    if isinstance(norm_data, np.memmap) and norm_data.filename.endswith('.npy'):
+        source = norm_data.filename
+    else:
+        norm_data = np.ascontiguousarray(norm_data)
+        memory = shared_memory.SharedMemory(create=True, size=norm_data.nbytes)
+        np.ndarray(norm_data.shape, dtype=norm_data.dtype, buffer=memory.buf)[:] = norm_data
+        source = memory.name
+    try:
+        with ProcessPoolExecutor(workers or os.cpu_count(), initializer=_attach,
+                                 initargs=(source, norm_data.shape, norm_data.dtype.str)) as pool:
+            yield pool
+    finally:
+        if memory is not None:
+            memory.close()
+            memory.unlink()
+
+
+def train_map(config, data):
+    """
+    Функция обучения карты с заданной конфигурацией гиперпараметров
+
+    :param config: конфигурация (sigma, learning_rate, grid_size, seed, epochs, engine, chunk_size)
+    :type config: dict
+    :param data: нормализованные данные
+    :type data: numpy.ndarray
+
+    :rtype: SOM.SOM
+    :return: модель с обученной картой
+    """
+    som = SOM.SOM(epochs=config['epochs'], learning_rate=config['learning_rate'], engine=config['engine'],
+                  sigma=config['sigma'], grid_size=config['grid_size'], random_seed=config['seed'])
+    som.grid_rows = som.grid_columns = config['grid_size']
+    som.__createSom__(data.shape[1])
+    if isinstance(som.som, BatchSom):
+        som.som.train(data, som.epochs, chunk_size=config['chunk_size'])
+    else:
+        som.som.train(data, som.epochs)
+    return som
+
+
+def _train_config(config):
+    """
+    Функция обучения карты с одной конфигурацией гиперпараметров
+
+    :param config: конфигурация (sigma, learning_rate, grid_size, seed, epochs, engine, chunk_size)
+    :type config: dict
+
+    :rtype: dict
+    :return: конфигурация и показатели качества карты
+    """
+    data = shared_data()
+    start = time.perf_counter()
+    som = train_map(config, data)
+    result = dict(config)
+    result['train_time'] = time.perf_counter() - start
+    result['quantization_error'] = quantization_error(som.som.get_weights(), data, config['chunk_size'])
+    result['topographic_error'] = topographic_error(som.som, data, config['chunk_size'])
+    return result
+
+
+def sweep(norm_data, sigmas, learning_rates, grid_sizes, seeds, epochs=1000, engine='batch', chunk_size=None,
+          workers=None):
+    """
+    Функция перебора гиперпараметров карты в пуле процессов
+
+    Нормализованные данные передаются процессам через общую память без копирования (shared_pool).
+    Пакетный алгоритм (engine='batch') не использует коэффициент обучения, поэтому для него
+    перебор по learning_rates не выполняется, а столбец learning_rate таблицы остается пустым (NaN).
+
+    :param norm_data: нормализованные данные
+    :type norm_data: numpy.ndarray
+    :param sigmas: значения радиуса соседства
+    :type sigmas: list
+    :param learning_rates: значения коэффициента обучения
+    :type learning_rates: list
+    :param grid_sizes: размеры стороны карты
+    :type grid_sizes: list
+    :param seeds: начальные значения генератора случайных чисел
+    :type seeds: list
+    :param epochs: количество эпох обучения
+    :type epochs: int
+    :param engine: алгоритм обучения ('minisom' или 'batch')
+    :type engine: str
+    :param chunk_size: размер блока обработки данных
+    :type chunk_size: int
+    :param workers: количество процессов (None - по числу ядер)
+    :type workers: int
+
+    :rtype: pandas.DataFrame
+    :return: таблица результатов, упорядоченная по сумме рангов ошибок квантования и топографической
+    """
+    batch = engine == 'batch'
+    if batch:
+        if len(learning_rates) > 1:
+            print("Learning rate is not used by the batch engine, its values are not swept")
+        learning_rates = learning_rates[:1]
+    configs = [dict(sigma=sigma, learning_rate=learning_rate, grid_size=grid_size, seed=seed, epochs=epochs,
+                    engine=engine, chunk_size=chunk_size)
+               for sigma, learning_rate, grid_size, seed
+               in itertools.product(sigmas, learning_rates, grid_sizes, seeds)]
+    with shared_pool(norm_data, workers) as pool:
+        results = pd.DataFrame(list(pool.map(_train_config, configs)))
+    if batch:
+        results['learning_rate'] = np.nan
+    results['rank'] = results['quantization_error'].rank() + results['topographic_error'].rank()
+    return results.sort_values(['rank', 'quantization_error']).reset_index(drop=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Перебор гиперпараметров самоорганизующейся карты")
+    parser.add_argument('--data', default="FlocculantsData.xlsx", help="файл с данными (xlsx или csv)")
+    parser.add_argument('--sigma', type=float, nargs='+', default=[1.0, 1.5, 2.0], help="радиусы соседства")
+    parser.add_argument('--learning-rate', type=float, nargs='+', default=[0.1, 0.5, 1.0],
+                        help="коэффициенты обучения (не перебираются для пакетного алгоритма)")
+    parser.add_argument('--grid', type=int, nargs='+', default=None,
+                        help="размеры стороны карты (по умолчанию - размер, выбираемый SOM)")
+    parser.add_argument('--seed', type=int, nargs='+', default=[0], help="начальные значения генератора")
+    parser.add_argument('--epochs', type=int, default=1000, help="количество эпох обучения")
+    parser.add_argument('--engine', choices=list(SOM.SOM.engines), default='batch', help="алгоритм обучения")
+    parser.add_argument('--chunk-size', type=int, default=None, help="размер блока потоковой обработки")
+    parser.add_argument('--workers', type=int, default=None, help="количество процессов")
+    parser.add_argument('--output', default="sweep.csv", help="файл таблицы результатов")
+    args = parser.parse_args()
+
+    som = SOM.SOM(args.data, chunk_size=args.chunk_size)
+    som.data_preprocessing()
+    grid_sizes = args.grid or [som.grid_rows]
+    results = sweep(som.norm_data, args.sigma, args.learning_rate, grid_sizes, args.seed, args.epochs,
+                    args.engine, args.chunk_size, args.workers)
+    results.to_csv(args.output, index=False)
+    print(results.head(10).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()